@@ -11,11 +11,36 @@ Or run the CLI:
     book-agent convert path/to/book.pdf -o books/mybook
 """
 
-from book_agent.api import convert_pdf_to_markdown
-from book_agent.models import ConversionResult, ConversionConfig
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from book_agent.api import convert_pdf_to_markdown
+    from book_agent.models import ConversionConfig, ConversionResult
 
 __all__ = [
     "convert_pdf_to_markdown",
     "ConversionResult",
     "ConversionConfig",
 ]
+
+# Public name -> defining module. Resolved on first access (PEP 562) so that importing a
+# submodule such as book_agent.markdown_index does not load pymupdf and pydantic.
+_LAZY_EXPORTS = {
+    "convert_pdf_to_markdown": "book_agent.api",
+    "ConversionResult": "book_agent.models",
+    "ConversionConfig": "book_agent.models",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -25,13 +25,14 @@ from book_agent.core import (
     _flatten_sections,
     get_section_content,
     load_index,
+    load_index_cached,
     list_toc,
 )
 from book_agent.tools.config import config_app
 from book_agent.tools.figure import figure_app, resolve_figure, get_figure_for_agent
 from book_agent.tools.index import run as run_index
 from book_agent.tools.read import run as run_read
-from book_agent.tools.search import run as run_search, search_sections
+from book_agent.tools.search import run as run_search, search_sections, search_sections_bulk
 from book_agent.tools.toc import run as run_toc
 from book_agent.tools.web_search import run_web_search
 from book_agent.tools.web_fetch import run_web_fetch, register_fetch_backend
@@ -57,9 +58,11 @@ __all__ = [
     "config_app",
     # Primitives (index/sections)
     "load_index",
+    "load_index_cached",
     "_flatten_sections",
     "list_toc",
     "search_sections",
+    "search_sections_bulk",
     "get_section_content",
     # Run-style API (one per tool)
     "run_index",
@@ -6,9 +6,12 @@ CLI entry point: run conversion (and future commands) from the shell.
     book-agent toc path/to/book_folder     # list table of contents
     book-agent search "term" path/to/book_folder
     book-agent read "Section Title" path/to/book_folder
+    book-agent serve < commands.txt        # run many commands in one process
 """
 
 import json
+import shlex
+import sys
 from pathlib import Path
 
 import typer
@@ -233,6 +236,29 @@ def sync_rule_cmd() -> None:
         typer.echo("Rule already in sync with registry.")
 
 
+@app.command("serve")
+def serve_cmd() -> None:
+    """
+    Run commands read from stdin, one per line without the program name (e.g.
+    search "term" books/mybook), in this process. A burst of tool calls then pays
+    interpreter and import startup once and reuses the cached indexes. Blank lines and
+    lines starting with # are skipped; a failing command is reported and the loop goes on.
+    """
+    for line in sys.stdin:
+        try:
+            args = shlex.split(line, comments=True)
+        except ValueError as e:
+            typer.echo(f"Error: {e}: {line.strip()}", err=True)
+            continue
+        if not args:
+            continue
+        try:
+            app(args, prog_name="book-agent", standalone_mode=False)
+        except Exception as e:  # usage errors included: keep serving
+            typer.echo(f"Error: {e}", err=True)
+        sys.stdout.flush()
+
+
 cursor_app = typer.Typer(help="Install book-agent MCP into Cursor for any workspace folder.")
 
 
@@ -3,13 +3,17 @@ Minimal shared primitives for book index and section content.
 No CLI, no Typer. Used by independent tool modules.
 """
 
-import json
+import os
+from array import array
+from functools import lru_cache
+from itertools import accumulate
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
 from book_agent.markdown_index import (
     INDEX_VERSION,
     TOCEnrichmentRequiredError,
+    _json_loads,
     build_index,
     write_index,
 )
@@ -23,8 +27,9 @@ def load_index(index_path: Path) -> Dict[str, Any]:
     can refresh old indices).
     """
     index_path = Path(index_path).resolve()
-    with open(index_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    # Raw bytes straight to orjson when installed (no decode step); stdlib json otherwise
+    with open(index_path, "rb") as f:
+        data = _json_loads(f.read())
     current = data.get("index_version")
     if current is not None and current >= INDEX_VERSION:
         return data
@@ -45,6 +50,22 @@ def load_index(index_path: Path) -> Dict[str, Any]:
     return index
 
 
+def load_index_cached(index_path: Path) -> Dict[str, Any]:
+    """
+    load_index, reusing the parsed index while index.json is unchanged on disk (same
+    mtime and size), so repeated toc/search/read calls on one book parse it once.
+    The returned dict is shared between callers: do not mutate it.
+    """
+    st = os.stat(index_path)
+    return _load_index_at(str(index_path), st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=32)
+def _load_index_at(index_path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """Cache slot for load_index_cached; mtime_ns and size are only part of the key."""
+    return load_index(Path(index_path))
+
+
 def _flatten_sections(sections: List[Dict], parent_path: str = "") -> List[Dict]:
     """Recursively flatten the section tree for searching."""
     flat = []
@@ -64,17 +85,110 @@ def _flatten_sections(sections: List[Dict], parent_path: str = "") -> List[Dict]
     return flat
 
 
+# id(index["chapters"]) -> [chapters, flat sections, lowercased titles, sections in
+# document order (filled on first use)]. Kept out of the index dict so nothing private
+# is written back by write_index. Each entry holds the chapters list itself, so its id
+# cannot be reused by another list while cached. Not locked: assumes a single-threaded
+# caller.
+_SECTIONS_CACHE: Dict[int, List[Any]] = {}
+_SECTIONS_CACHE_SIZE = 32
+
+
+def _sections_entry(index: Dict[str, Any]) -> List[Any]:
+    """
+    The _SECTIONS_CACHE entry for index["chapters"], built on first use and rebuilt if
+    the chapters list is replaced. Indexes from load_index_cached are shared, so
+    repeated queries on a book flatten its tree and lowercase its titles once.
+    """
+    chapters = index.get("chapters", [])
+    entry = _SECTIONS_CACHE.get(id(chapters))
+    if entry is None or entry[0] is not chapters:
+        flat = _flatten_sections(chapters)
+        titles_lower = [(sec["title"] or "").lower() for sec in flat]
+        entry = [chapters, flat, titles_lower, None]
+        if len(_SECTIONS_CACHE) >= _SECTIONS_CACHE_SIZE:
+            _SECTIONS_CACHE.pop(next(iter(_SECTIONS_CACHE)), None)  # oldest first
+        _SECTIONS_CACHE[id(chapters)] = entry
+    return entry
+
+
+def _get_flat_sections(index: Dict[str, Any]) -> List[Dict]:
+    """_flatten_sections(index["chapters"]), memoized per chapters list. Treat as read-only."""
+    return _sections_entry(index)[1]
+
+
+def _get_flat_titles_lower(index: Dict[str, Any]) -> List[str]:
+    """Lowercased title of each _get_flat_sections entry, same order. Treat as read-only."""
+    return _sections_entry(index)[2]
+
+
+def _get_sections_in_document_order(index: Dict[str, Any]) -> List[Tuple[str, Dict]]:
+    """
+    (lowercased title, section) for the flat sections that have both md_start_line and
+    md_end_line, sorted by (md_start_line, md_end_line). Memoized with the flat
+    sections, so content search does not re-sort per query. Treat as read-only.
+    """
+    entry = _sections_entry(index)
+    if entry[3] is None:
+        entry[3] = sorted(
+            [
+                (title, sec)
+                for title, sec in zip(entry[2], entry[1])
+                if sec.get("md_start_line") and sec.get("md_end_line")
+            ],
+            key=lambda ts: (ts[1]["md_start_line"], ts[1]["md_end_line"]),
+        )
+    return entry[3]
+
+
 def get_section_content(section: Dict, md_path: Path) -> str:
     """Read the markdown content for a specific section (by line range)."""
     start = section.get("md_start_line")
     end = section.get("md_end_line")
     if start is None or end is None:
         return ""
+    text, offsets = _document(md_path)
+    s_idx, e_idx, _ = slice(max(0, start - 1), end - 1).indices(len(offsets) - 1)
+    return text[offsets[s_idx]:offsets[e_idx]] if s_idx < e_idx else ""
+
+
+def _document(md_path: Path) -> Tuple[str, array]:
+    """
+    (text, offsets): the markdown as read in text mode and the start of each line in it
+    (offsets[i] for line i+1, plus the total length at the end), so lines s..e-1 are
+    text[offsets[s]:offsets[e]]. Cached while the file is unchanged (same mtime and size).
+    """
+    st = os.stat(md_path)
+    return _document_at(str(md_path), st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=8)
+def _document_at(md_path: str, mtime_ns: int, size: int) -> Tuple[str, array]:
+    """Cache slot for _document; mtime_ns and size are only part of the key."""
+    with open(md_path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    return "".join(lines), array("q", accumulate(map(len, lines), initial=0))
+
+
+def _lowered_document(md_path: Path) -> Tuple[str, array]:
+    """
+    (text, offsets): the markdown lowercased line by line and joined, and the start of
+    each line in it (offsets[i] for line i+1, plus the total length at the end). A
+    section's lowercased content is text[offsets[s]:offsets[e]] for the same s:e line
+    slice get_section_content reads, so content search is a bounded str.find. Cached
+    while the file is unchanged (same mtime and size).
+    """
+    st = os.stat(md_path)
+    return _lowered_document_at(str(md_path), st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=8)
+def _lowered_document_at(md_path: str, mtime_ns: int, size: int) -> Tuple[str, array]:
+    """Cache slot for _lowered_document; mtime_ns and size are only part of the key."""
     with open(md_path, "r", encoding="utf-8") as f:
-        all_lines = f.readlines()
-    s_idx = max(0, start - 1)
-    e_idx = min(len(all_lines), end - 1)
-    return "".join(all_lines[s_idx:e_idx])
+        # Per line, like get_section_content's slices (lower() can change lengths)
+        lowered = [line.lower() for line in f]
+    return "".join(lowered), array("q", accumulate(map(len, lowered), initial=0))
 
 
 def list_toc(index: Dict[str, Any], max_depth: int = 2) -> List[str]:
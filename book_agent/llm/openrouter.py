@@ -94,3 +94,8 @@ class OpenRouterBackend:
     @property
     def name(self) -> str:
         return "openrouter"
+
+    @property
+    def default_model(self) -> str:
+        """Model used when complete() is called without an explicit model."""
+        return self._default_model
@@ -19,13 +19,26 @@ same-or-shallower depth.
 """
 
 import bisect
+import hashlib
 import json
 import logging
+import os
 import re
+import sys
+import threading
 import time
+from array import array
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
 
+try:
+    import orjson as _orjson
+except ImportError:  # optional: pip install -e ".[fast]"
+    _orjson = None
+
 log = logging.getLogger(__name__)
 
 # Bump this when index schema or build logic changes; stale indices will be rebuilt on load.
@@ -42,12 +55,20 @@ class TOCEnrichmentRequiredError(Exception):
 PAGE_MARKER_RE = re.compile(r"^\s*\{(\d+)\}\s*-+\s*$")
 HEADING_RE = re.compile(r"^#{1,6}\s+(.+)$")
 TABLE_ROW_RE = re.compile(r"^\s*\|(.+)\|\s*$")
+TABLE_SEP_RE = re.compile(r"^\s*\|[-:| ]+\|\s*$")
 SECTION_NUM_RE = re.compile(r"^(\d+(?:\.\d+)*)[.\s]")
 HTML_TAG_RE = re.compile(r"<[^>]+>")
 # Extract pdf page from heading line: <span id="page-38-0"> or id="page-1173-0"
 PAGE_SPAN_RE = re.compile(r'id="page-(\d+)')
+# TOC entries: "contents" headers, trailing page numbers, [title](#page-N) links
+_CONTENTS_WORD_RE = re.compile(r"\bcontents\b", re.IGNORECASE)
+_TRAILING_NUM_RE = re.compile(r"\d+\s*$")
+_PAGE_LINK_RE = re.compile(r"#page-(\d+)")
+_MD_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
 
 ROMAN = {"i": 1, "v": 5, "x": 10, "l": 50, "c": 100, "d": 500, "m": 1000}
+# ASCII code → roman digit value (0 = not a roman digit)
+_ROMAN_LUT = tuple(ROMAN.get(chr(i), 0) for i in range(128))
 
 
 # ---------------------------------------------------------------------------
@@ -55,16 +76,21 @@ ROMAN = {"i": 1, "v": 5, "x": 10, "l": 50, "c": 100, "d": 500, "m": 1000}
 # ---------------------------------------------------------------------------
 
 def _roman_to_int(s: str) -> int | None:
-    s = s.strip().lower()
-    if not s or not all(c in ROMAN for c in s):
+    try:
+        b = s.strip().lower().encode("ascii")
+    except UnicodeEncodeError:
+        return None
+    if not b:
         return None
+    # Single right-to-left pass: a digit smaller than the one after it is subtracted.
     val = 0
-    for i, c in enumerate(s):
-        v = ROMAN[c]
-        if i + 1 < len(s) and ROMAN[s[i + 1]] > v:
-            val -= v
-        else:
-            val += v
+    nxt = 0
+    for c in reversed(b):
+        v = _ROMAN_LUT[c]
+        if not v:
+            return None
+        val += -v if v < nxt else v
+        nxt = v
     return val
 
 _GREEK_MAP = {
@@ -75,54 +101,83 @@ _GREEK_MAP = {
     "psi": "ψ", "omega": "ω",
 }
 
+# _normalize patterns, compiled once (it runs on every TOC title and candidate heading).
+_MD_ESCAPE_RE = re.compile(r"\\([*_#`])")
+_LATEX_INLINE_RE = re.compile(r"\$([^$]*)\$")
+_LATEX_CMD_RE = re.compile(r"\\(?:mathbf|mathrm|mathbb|text|operatorname|overline|"
+                           r"bar|hat|tilde|vec|Big|big|left|right)\b")
+_PAREN_OPEN_WS_RE = re.compile(r"\(\s+")
+_PAREN_CLOSE_WS_RE = re.compile(r"\s+\)")
+_DASH_VARIANT_RE = re.compile(r"[\u2010\u2011\u2012\u2013\u2014\u2015\u2212\uFE58\uFE63\uFF0D]")
+_SPACED_HYPHEN_RE = re.compile(r"\s+-\s+")
+_HYPHEN_LEFT_WS_RE = re.compile(r"(\w)\s+-(\w)")
+_HYPHEN_RIGHT_WS_RE = re.compile(r"(?<=\S)-\s+")
+_DIGIT_UPPER_RE = re.compile(r"(\d)([A-Z])")
+
+@lru_cache(maxsize=8192)
 def _normalize(t: str) -> str:
     """Normalize text for fuzzy heading matching.
 
     Strips HTML, markdown formatting, LaTeX math (replacing Greek commands with
-    Unicode), collapses whitespace, and normalizes dashes.
+    Unicode), collapses whitespace, and normalizes dashes.  Memoized: the same
+    TOC titles are normalized repeatedly across parsing, offset and matching.
     """
-    t = HTML_TAG_RE.sub("", t)
-    # Markdown bold/italic + escaped chars
+    if "<" in t:
+        t = HTML_TAG_RE.sub("", t)
+    # Markdown bold/italic + escaped chars.  Kept as str.replace: a replace that finds
+    # nothing returns the string as is, while str.translate (tried) always rebuilds it
+    # and measured ~10x slower here; "_" also maps to a space, not to nothing.
     t = t.replace("**", "").replace("__", "")
-    t = re.sub(r"\\([*_#`])", "", t)
+    if "\\" in t:
+        t = _MD_ESCAPE_RE.sub("", t)
     t = t.replace("*", "").replace("_", " ")
     # HTML entities
     t = t.replace("&amp;", " and ").replace("&", " and ")
     # LaTeX: unwrap $...$ and replace Greek with Unicode
-    t = re.sub(r"\$([^$]*)\$", r" \1 ", t)
-    for cmd, char in _GREEK_MAP.items():
-        t = t.replace(f"\\{cmd}", char)
-    t = re.sub(r"\\(?:mathbf|mathrm|mathbb|text|operatorname|overline|"
-               r"bar|hat|tilde|vec|Big|big|left|right)\b", "", t)
-    t = t.replace("\\", "")
+    if "$" in t:
+        t = _LATEX_INLINE_RE.sub(r" \1 ", t)
+    if "\\" in t:  # Greek and formatting commands all start with a backslash
+        for cmd, char in _GREEK_MAP.items():
+            t = t.replace(f"\\{cmd}", char)
+        t = _LATEX_CMD_RE.sub("", t)
+        t = t.replace("\\", "")
     t = t.replace("{", "").replace("}", "")
     # Collapse whitespace inside parens: "( λ )" → "(λ)"
-    t = re.sub(r"\(\s+", "(", t)
-    t = re.sub(r"\s+\)", ")", t)
+    if "(" in t or ")" in t:
+        t = _PAREN_OPEN_WS_RE.sub("(", t)
+        t = _PAREN_CLOSE_WS_RE.sub(")", t)
     # All dash variants → hyphen
-    t = re.sub(r"[\u2010\u2011\u2012\u2013\u2014\u2015\u2212\uFE58\uFE63\uFF0D]", "-", t)
-    # Standalone hyphen separator: "A - B" → "A B"
-    t = re.sub(r"\s+-\s+", " ", t)
-    # OCR space after hyphen in compound word: "k -armed" → "k-armed"
-    t = re.sub(r"(\w)\s+-(\w)", r"\1-\2", t)
-    # OCR artifact: space before hyphen: "Long- Short" → "Long-Short"
-    t = re.sub(r"(?<=\S)-\s+", "-", t)
+    if not t.isascii():
+        t = _DASH_VARIANT_RE.sub("-", t)
+    if "-" in t:
+        # Standalone hyphen separator: "A - B" → "A B"
+        t = _SPACED_HYPHEN_RE.sub(" ", t)
+        # OCR space after hyphen in compound word: "k -armed" → "k-armed"
+        t = _HYPHEN_LEFT_WS_RE.sub(r"\1-\2", t)
+        # OCR artifact: space before hyphen: "Long- Short" → "Long-Short"
+        t = _HYPHEN_RIGHT_WS_RE.sub("-", t)
     # Missing space between number and title: "16.6.1AlphaGo" → "16.6.1 AlphaGo"
-    t = re.sub(r"(\d)([A-Z])", r"\1 \2", t)
+    t = _DIGIT_UPPER_RE.sub(r"\1 \2", t)
     return " ".join(t.split())
 
+@lru_cache(maxsize=4096)
 def _section_num(title: str) -> str | None:
     """Extract '1.2' from '1.2 Foo'."""
     m = SECTION_NUM_RE.match(title.strip())
     return m.group(1) if m else None
 
+_CHAPTER_PREFIX_RE = re.compile(r"^chapter\s+", re.IGNORECASE)
+_LEADING_SECTION_NUM_RE = re.compile(r"^\d+(\.\d+)*[.\s]*")
+
+@lru_cache(maxsize=8192)
 def _strip_section_num(s: str) -> str:
     """Strip leading section number and optional 'Chapter' prefix.
 
     'Chapter 1 Foo' → 'foo', '1.2 Bar' → 'bar', '2 Bar' → 'bar'.
+    Memoized alongside _normalize, whose output it is usually fed.
     """
-    s = re.sub(r"^chapter\s+", "", s, flags=re.IGNORECASE)
-    return re.sub(r"^\d+(\.\d+)*[.\s]*", "", s).strip()
+    s = _CHAPTER_PREFIX_RE.sub("", s)
+    return _LEADING_SECTION_NUM_RE.sub("", s).strip()
 
 def _depth(title: str) -> int:
     """
@@ -141,20 +196,25 @@ def _depth(title: str) -> int:
         return 1
     return 1
 
+_SLUG_SEP_RE = re.compile(r"[^a-z0-9]+")
+
+
 def _slug(title: str, idx: int) -> str:
     """Generate a stable ID."""
+    return _slug_base(title) or f"sec_{idx:03d}"
+
+
+@lru_cache(maxsize=8192)
+def _slug_base(title: str) -> str:
+    """The title-derived part of _slug ("" when the title has no usable characters)."""
     # If it has a number, use it: 1.2.3 -> sec_1_2_3
     num = _section_num(title)
     if num:
         return "sec_" + num.replace(".", "_")
     
     # Fallback: simple slug
-    slug = re.sub(r"[^a-z0-9]+", "_", title.lower()).strip("_")
-    if not slug:
-        slug = f"sec_{idx:03d}"
-    if len(slug) > 30:
-        slug = slug[:30]
-    return slug
+    slug = _SLUG_SEP_RE.sub("_", title.lower()).strip("_")
+    return slug[:30]
 
 # ---------------------------------------------------------------------------
 # Phase 1: Parse TOC
@@ -171,9 +231,14 @@ def _contents_section_bounds(lines: list[str]) -> tuple[int, int] | None:
     - Headings whose text ends with a number (trailing page number in a
       TOC entry, e.g. ``### 6 HOW TO USE THE INDICATORS 97``)
     Returns (start, end) inclusive, or None if no Contents heading found.
+
+    Callers that need the bounds more than once per document compute them here
+    once and pass them on via the ``bounds=`` keyword of the TOC helpers.
     """
     start = None
     for i, line in enumerate(lines, start=1):
+        if "#" not in line:  # fast reject before strip + regex
+            continue
         m = HEADING_RE.match(line.strip())
         if not m:
             continue
@@ -188,22 +253,38 @@ def _contents_section_bounds(lines: list[str]) -> tuple[int, int] | None:
         return None
     end = len(lines)
     for i in range(start, len(lines)):
-        m = HEADING_RE.match(lines[i - 1])
+        line = lines[i - 1]
+        if line[:1] != "#":
+            continue
+        m = HEADING_RE.match(line)
         if not m:
             continue
         heading_text = m.group(1).strip()
-        if re.search(r'\bcontents\b', heading_text, re.IGNORECASE):
+        if _CONTENTS_WORD_RE.search(heading_text):
             continue
-        if re.search(r'\d+\s*$', heading_text):
+        if _TRAILING_NUM_RE.search(heading_text):
             continue
         # Headings with embedded page links (#page-N) are TOC entries
-        if re.search(r'#page-\d+', heading_text):
+        if _PAGE_LINK_RE.search(heading_text):
             continue
         end = i - 1
         break
     return (start, end)
 
 
+# Sentinel for the ``bounds=`` keyword: "not precomputed, scan ``lines``".
+# Distinct from None, which means "scanned, no Contents section".
+_BOUNDS_UNSET = object()
+
+
+def _resolve_contents_bounds(
+    lines: list[str], bounds: tuple[int, int] | None | object
+) -> tuple[int, int] | None:
+    if bounds is _BOUNDS_UNSET:
+        return _contents_section_bounds(lines)
+    return bounds  # type: ignore[return-value]
+
+
 # Context lines to include before/after the TOC table when sending to LLM (e.g. ## Contents heading)
 TOC_RAW_CONTEXT_BEFORE = 2
 TOC_RAW_CONTEXT_AFTER = 0
@@ -212,19 +293,27 @@ TOC_RAW_CONTEXT_AFTER = 0
 _RUNNING_HEADER_RE = re.compile(
     r"^\s*(contents|table of contents)\s*[ivxlcdm\d]*\s*$", re.IGNORECASE
 )
+# Lines dropped from the raw TOC: a page marker or a running header.  One
+# alternation instead of PAGE_MARKER_RE then _RUNNING_HEADER_RE on a stripped copy
+# (both patterns already absorb surrounding whitespace).
+_TOC_NOISE_RE = re.compile(
+    r"^\s*(?:\{\d+\}\s*-+|(?i:(?:contents|table of contents)\s*[ivxlcdm\d]*))\s*$"
+)
+_SPACE_RUN_RE = re.compile(r" {2,}")
 
 
 def _get_raw_toc_markdown(
     lines: list[str],
     context_before: int = TOC_RAW_CONTEXT_BEFORE,
     context_after: int = TOC_RAW_CONTEXT_AFTER,
+    bounds: tuple[int, int] | None | object = _BOUNDS_UNSET,
 ) -> str | None:
     """
     Return the raw markdown of the Contents section for the LLM.
     Strips page-break markers ({N}---) and running headers ("CONTENTS vii")
     so the LLM only sees actual TOC rows.
     """
-    bounds = _contents_section_bounds(lines)
+    bounds = _resolve_contents_bounds(lines, bounds)
     if not bounds:
         return None
     start_1, end_1 = bounds
@@ -232,12 +321,11 @@ def _get_raw_toc_markdown(
     end_0 = min(len(lines), end_1 + context_after)
     cleaned: list[str] = []
     for line in lines[start_0:end_0]:
-        if PAGE_MARKER_RE.match(line):
-            continue
-        if _RUNNING_HEADER_RE.match(line.strip()):
+        if _TOC_NOISE_RE.match(line):
             continue
         # Collapse runs of spaces (table padding) — saves ~65% of tokens
-        line = re.sub(r" {2,}", " ", line)
+        if "  " in line:
+            line = _SPACE_RUN_RE.sub(" ", line)
         cleaned.append(line)
     return "".join(cleaned).strip() or None
 
@@ -269,35 +357,63 @@ _CHAPTER_WORD_RE = re.compile(
 _ITEM_WORD_RE = re.compile(r'^item\s+\d+\b', re.IGNORECASE)
 
 
-def _has_part_headings(rows: list[tuple[str, int]]) -> bool:
-    """Check whether any row looks like a Part heading (Roman or spelled-out)."""
-    return any(
-        _ROMAN_PART_RE.match(t.strip()) or _PART_WORD_RE.match(t.strip())
-        for t, _ in rows
+# Every title pattern above in one alternation, in the precedence order of the
+# if/elif chains below; ``lastgroup`` names the kind of title that matched.
+_TITLE_KIND_RE = re.compile("|".join(
+    f"(?P<{kind}>{'(?i:' + rx.pattern + ')' if rx.flags & re.IGNORECASE else rx.pattern})"
+    for kind, rx in (
+        ("roman_part", _ROMAN_PART_RE),
+        ("part_word", _PART_WORD_RE),
+        ("dotted_3", _DOTTED_3_RE),
+        ("dotted_2", _DOTTED_2_RE),
+        ("chapter_word", _CHAPTER_WORD_RE),
+        ("chapter_num", _CHAPTER_NUM_RE),
+        ("front_back", _FRONT_BACK_RE),
+        ("item_word", _ITEM_WORD_RE),
     )
+))
+
+
+@lru_cache(maxsize=4096)
+def _title_kind(s: str) -> str | None:
+    """Classify a stripped TOC title by its leading pattern (see _TITLE_KIND_RE), or None.
+
+    Memoized: the chunked LLM path classifies every title in
+    _mechanical_assign_depths and again in _enforce_depth_constraints.
+    """
+    m = _TITLE_KIND_RE.match(s)
+    return m.lastgroup if m else None
+
+
+_PART_KINDS = frozenset(("roman_part", "part_word"))
+
+
+def _has_part_headings(rows: list[tuple[str, int]]) -> bool:
+    """Check whether any row looks like a Part heading (Roman or spelled-out).
+
+    One memoized _title_kind lookup per row; Part patterns lead the alternation,
+    so a Part title always classifies as one.  ``any`` stops at the first hit.
+    """
+    return any(_title_kind(t.strip()) in _PART_KINDS for t, _ in rows)
 
 def _mechanical_assign_depths(rows: list[tuple[str, int]]) -> list[dict]:
     """Assign depths without LLM, using title patterns.  Fast and deterministic."""
     inside_part = False
     enriched = []
     for title, page in rows:
-        s = title.strip()
+        kind = _title_kind(title.strip())
         p = 1 if inside_part else 0
-        if _ROMAN_PART_RE.match(s) or _PART_WORD_RE.match(s):
+        if kind == "roman_part" or kind == "part_word":
             inside_part = True
             depth = 1
-        elif _DOTTED_3_RE.match(s):
+        elif kind == "dotted_3":
             depth = 3 + p
-        elif _DOTTED_2_RE.match(s):
+        elif kind == "dotted_2":
             depth = 2 + p
-        elif _CHAPTER_WORD_RE.match(s):
+        elif kind == "chapter_word" or kind == "chapter_num":
             depth = 1 + p
-        elif _CHAPTER_NUM_RE.match(s):
-            depth = 1 + p
-        elif _FRONT_BACK_RE.match(s):
+        elif kind == "front_back":
             depth = 1
-        elif _ITEM_WORD_RE.match(s):
-            depth = 2
         else:
             depth = 2
         enriched.append({"title": title, "depth": depth, "page": page})
@@ -315,36 +431,37 @@ def _enforce_depth_constraints(entries: list[dict]) -> list[dict]:
     for e in entries:
         s = e["title"].strip()
         d = e["depth"]
+        kind = _title_kind(s)
         p = 1 if inside_part else 0
-        if _ROMAN_PART_RE.match(s) or _PART_WORD_RE.match(s):
+        if kind == "roman_part" or kind == "part_word":
             inside_part = True
             if d != 1:
                 log.debug("Forcing Part heading to depth 1: %s", s)
                 e["depth"] = 1
-        elif _DOTTED_3_RE.match(s):
+        elif kind == "dotted_3":
             target = 3 + p
             if d != target:
                 log.debug("Forcing N.N.N entry to depth %d: %s", target, s)
                 e["depth"] = target
-        elif _DOTTED_2_RE.match(s):
+        elif kind == "dotted_2":
             target = 2 + p
             if d != target:
                 log.debug("Forcing N.N entry to depth %d: %s", target, s)
                 e["depth"] = target
-        elif _CHAPTER_WORD_RE.match(s):
+        elif kind == "chapter_word":
             target = 1 + p
             if d != target:
                 log.debug("Forcing 'Chapter N' heading to depth %d: %s", target, s)
                 e["depth"] = target
-        elif _CHAPTER_NUM_RE.match(s):
+        elif kind == "chapter_num":
             target = 1 + p
             if d != target:
                 log.debug("Forcing bare number entry to depth %d: %s", target, s)
                 e["depth"] = target
-        elif _FRONT_BACK_RE.match(s) and d != 1:
+        elif kind == "front_back" and d != 1:
             log.debug("Forcing front/back matter to depth 1: %s", s)
             e["depth"] = 1
-        elif _ITEM_WORD_RE.match(s) and d < 2:
+        elif kind == "item_word" and d < 2:
             log.debug("Forcing 'Item N' entry to depth 2: %s", s)
             e["depth"] = 2
     return entries
@@ -365,6 +482,25 @@ Output ONLY the JSON array, nothing else."""
 _LLM_CHUNK_SIZE = 200
 _LLM_CHUNK_CONTEXT = 5  # overlap entries from previous chunk for hierarchy context
 _LLM_SKIP_THRESHOLD = 500  # skip LLM entirely only for very large flat TOCs
+_LLM_SERIAL_CHUNKS = 2  # chunks sent one after another before the rest go out concurrently
+_LLM_PARALLEL_CHUNKS = 4  # max concurrent LLM chunk calls
+
+
+# A flat JSON array of plain numbers ("[1, 2, 2.0, 3]"), the expected depth answer.
+_JSON_NUM = r"-?(?:0|[1-9]\d*)(?:\.\d+)?"
+_DEPTH_ARRAY_RE = re.compile(rf"\[\s*{_JSON_NUM}(?:\s*,\s*{_JSON_NUM})*\s*\]")
+_DEPTH_NUM_RE = re.compile(_JSON_NUM)
+
+
+def _json_loads(text: str | bytes):
+    """json.loads via orjson when installed. Anything orjson rejects (NaN, ints over
+    64 bits, ...) is retried with json so results and errors match the stdlib."""
+    if _orjson is not None:
+        try:
+            return _orjson.loads(text)
+        except _orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
 
 
 def _parse_llm_depth_response(response: str | None) -> list[int] | None:
@@ -377,18 +513,79 @@ def _parse_llm_depth_response(response: str | None) -> list[int] | None:
         end = text.rfind("]") + 1
         if start >= 0 and end > start:
             text = text[start:end]
+    # Fast path: scan the numbers directly; anything else goes through json below.
+    if _DEPTH_ARRAY_RE.fullmatch(text):
+        depths = [int(float(m.group())) for m in _DEPTH_NUM_RE.finditer(text)]
+        return [d if 1 <= d <= 6 else max(1, min(6, d)) for d in depths]
     try:
-        data = json.loads(text)
+        data = _json_loads(text)
     except json.JSONDecodeError as e:
         log.warning("LLM TOC response not valid JSON: %s", e)
         return None
     if not isinstance(data, list) or len(data) == 0:
         return None
     if all(isinstance(d, (int, float)) for d in data):
-        return [max(1, min(6, int(d))) for d in data]
+        depths = [int(d) for d in data]
+        return [d if 1 <= d <= 6 else max(1, min(6, d)) for d in depths]
     return None
 
 
+# ---------------------------------------------------------------------------
+# On-disk cache of LLM answers (rebuilding an unchanged book skips the calls)
+# ---------------------------------------------------------------------------
+# Location: BOOK_AGENT_CACHE_DIR, else $XDG_CACHE_HOME/book_agent, else ~/.cache/book_agent.
+# Set BOOK_AGENT_LLM_CACHE=0 to disable.
+
+def _llm_cache_dir() -> Path | None:
+    if os.environ.get("BOOK_AGENT_LLM_CACHE", "1").strip().lower() in ("0", "false", "no", "off"):
+        return None
+    root = os.environ.get("BOOK_AGENT_CACHE_DIR")
+    if not root:
+        xdg = os.environ.get("XDG_CACHE_HOME")
+        root = str(Path(xdg) / "book_agent") if xdg else str(Path.home() / ".cache" / "book_agent")
+    return Path(root) / "llm"
+
+
+def _llm_cache_key(*parts: object) -> str:
+    """Hash everything that determines the LLM answer (prompt, system, model, index version)."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(str(INDEX_VERSION).encode())
+    for part in parts:
+        h.update(b"\0")
+        h.update(str(part).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _llm_cache_get(key: str) -> str | None:
+    """Return the cached LLM response text for key, or None on miss."""
+    cache_dir = _llm_cache_dir()
+    if cache_dir is None:
+        return None
+    try:
+        with open(cache_dir / f"{key}.json", "r", encoding="utf-8") as f:
+            response = json.load(f).get("response")
+    except (OSError, ValueError, AttributeError):
+        return None
+    return response if isinstance(response, str) else None
+
+
+def _llm_cache_put(key: str, response: str) -> None:
+    """Store an LLM response that parsed successfully. Failures are logged and ignored."""
+    cache_dir = _llm_cache_dir()
+    if cache_dir is None:
+        return
+    path = cache_dir / f"{key}.json"
+    # Per process and thread: LLM chunk calls run on a thread pool
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"response": response}, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        log.debug("LLM cache write failed (%s): %s", path, e)
+
+
 def _llm_depths_for_batch(
     rows: list[tuple[str, int]],
     context: list[tuple[str, int, int]] | None = None,
@@ -420,21 +617,34 @@ def _llm_depths_for_batch(
 
     t0 = time.monotonic()
     try:
-        response = complete(
-            prompt,
-            system=TOC_DEPTH_SYSTEM,
-            temperature=0.0,
-            max_tokens=max_tok,
-            client=get_client(tool="toc"),
+        client = get_client(tool="toc")
+        cache_key = _llm_cache_key(
+            TOC_DEPTH_SYSTEM, prompt, max_tok, getattr(client, "default_model", ""),
         )
+        cached = _llm_cache_get(cache_key)
+        if cached is not None:
+            response = cached
+        else:
+            response = complete(
+                prompt,
+                system=TOC_DEPTH_SYSTEM,
+                temperature=0.0,
+                max_tokens=max_tok,
+                client=client,
+            )
     except Exception as e:
         elapsed = time.monotonic() - t0
         log.warning("LLM depth batch failed after %.1fs: %s", elapsed, e)
         return None
-    elapsed = time.monotonic() - t0
-    log.info("  LLM chunk responded in %.1fs", elapsed)
+    if cached is not None:
+        log.info("  LLM chunk answered from cache")
+    else:
+        elapsed = time.monotonic() - t0
+        log.info("  LLM chunk responded in %.1fs", elapsed)
 
     depths = _parse_llm_depth_response(response)
+    if depths is not None and cached is None:
+        _llm_cache_put(cache_key, response)
     if depths is not None and len(depths) != n:
         log.warning(
             "  LLM returned %d depths for %d entries; padding/truncating",
@@ -474,8 +684,8 @@ def _enrich_toc_from_raw_markdown_llm(
         # For very large TOCs without Part headings, mechanical is reliable
         # and faster — skip chunked LLM calls entirely.  Moderate-size TOCs
         # (up to _LLM_SKIP_THRESHOLD) still go through LLM via chunking.
+        has_parts = _has_part_headings(parsed_rows)
         if n > _LLM_SKIP_THRESHOLD:
-            has_parts = _has_part_headings(parsed_rows)
             if not has_parts:
                 log.info(
                     "Large TOC (%d entries, no Part headings) — using mechanical depths.",
@@ -495,52 +705,79 @@ def _enrich_toc_from_raw_markdown_llm(
             log.info("Single LLM call failed; falling back to mechanical depths.")
             return _mechanical_assign_depths(parsed_rows)
 
-        # Chunked: split into batches with overlap context
-        all_depths: list[int] = []
-        context: list[tuple[str, int, int]] | None = None
-        num_chunks = (n + _LLM_CHUNK_SIZE - 1) // _LLM_CHUNK_SIZE
-        failed_chunks = 0
-        for ci in range(num_chunks):
+        # Chunked results are validated against mechanical, which is immune to
+        # chunk-boundary confusion: without Part headings, mechanical wins as
+        # soon as it already understands the hierarchy (produces depth 3).
+        # That verdict does not depend on the LLM, so reach it before any calls.
+        mech_result = _mechanical_assign_depths(parsed_rows)
+        mech_depths = [e["depth"] for e in mech_result]
+        if not has_parts and 3 in mech_depths:
+            log.info(
+                "Mechanical depths have 3 hierarchy levels "
+                "(d1=%d, d3=%d) — using mechanical over chunked LLM.",
+                mech_depths.count(1), mech_depths.count(3),
+            )
+            return mech_result
+
+        # Chunked: split into batches with overlap context.  The first
+        # _LLM_SERIAL_CHUNKS run in order, each seeing the previous chunk's
+        # LLM depths; the rest run concurrently (the calls are I/O-bound),
+        # each seeing the previous chunk's tail with mechanical depths.
+        chunks = [parsed_rows[s:s + _LLM_CHUNK_SIZE] for s in range(0, n, _LLM_CHUNK_SIZE)]
+        num_chunks = len(chunks)
+        chunk_depths: list[list[int] | None] = [None] * num_chunks
+
+        def _tail_context(
+            chunk: list[tuple[str, int]], depths: list[int]
+        ) -> list[tuple[str, int, int]]:
+            ctx_start = max(0, len(chunk) - _LLM_CHUNK_CONTEXT)
+            return [(chunk[j][0], chunk[j][1], depths[j]) for j in range(ctx_start, len(chunk))]
+
+        def _log_chunk(ci: int) -> None:
             start = ci * _LLM_CHUNK_SIZE
-            end = min(start + _LLM_CHUNK_SIZE, n)
-            chunk = parsed_rows[start:end]
             log.info(
                 "  LLM chunk %d/%d (entries %d–%d)...",
-                ci + 1, num_chunks, start + 1, end,
+                ci + 1, num_chunks, start + 1, start + len(chunks[ci]),
             )
-            depths = _llm_depths_for_batch(chunk, context=context)
+
+        context: list[tuple[str, int, int]] | None = None
+        for ci in range(min(_LLM_SERIAL_CHUNKS, num_chunks)):
+            _log_chunk(ci)
+            chunk_depths[ci] = _llm_depths_for_batch(chunks[ci], context=context)
+            depths = chunk_depths[ci]
+            if depths is None:
+                depths = [e["depth"] for e in _mechanical_assign_depths(chunks[ci])]
+            context = _tail_context(chunks[ci], depths)
+
+        if num_chunks > _LLM_SERIAL_CHUNKS:
+            with ThreadPoolExecutor(max_workers=_LLM_PARALLEL_CHUNKS) as pool:
+                futures = {}
+                for ci in range(_LLM_SERIAL_CHUNKS, num_chunks):
+                    _log_chunk(ci)
+                    prev_start = (ci - 1) * _LLM_CHUNK_SIZE
+                    prev_depths = mech_depths[prev_start:prev_start + len(chunks[ci - 1])]
+                    futures[ci] = pool.submit(
+                        _llm_depths_for_batch,
+                        chunks[ci],
+                        _tail_context(chunks[ci - 1], prev_depths),
+                    )
+                for ci, future in futures.items():
+                    chunk_depths[ci] = future.result()
+
+        all_depths: list[int] = []
+        failed_chunks = 0
+        for ci, depths in enumerate(chunk_depths):
             if depths is None:
                 failed_chunks += 1
                 log.warning("  Chunk %d failed; using mechanical fallback for this chunk.", ci + 1)
-                chunk_enriched = _mechanical_assign_depths(chunk)
+                chunk_enriched = _mechanical_assign_depths(chunks[ci])
                 depths = [e["depth"] for e in chunk_enriched]
             all_depths.extend(depths)
-            ctx_start = max(0, len(chunk) - _LLM_CHUNK_CONTEXT)
-            context = [
-                (chunk[j][0], chunk[j][1], depths[j])
-                for j in range(ctx_start, len(chunk))
-            ]
 
-        llm_result = _enforce_depth_constraints([
+        return _enforce_depth_constraints([
             {"title": t, "depth": d, "page": p}
             for (t, p), d in zip(parsed_rows, all_depths)
         ])
-        # Validate chunked LLM results against mechanical.  Mechanical is
-        # immune to chunk-boundary confusion, so prefer it when it already
-        # understands the hierarchy (i.e. produces all 3 depth levels).
-        has_parts = _has_part_headings(parsed_rows)
-        if not has_parts:
-            mech_result = _mechanical_assign_depths(parsed_rows)
-            mech_top = sum(1 for e in mech_result if e["depth"] == 1)
-            mech_d3 = sum(1 for e in mech_result if e["depth"] == 3)
-            if mech_d3 > 0:
-                log.info(
-                    "Mechanical depths have 3 hierarchy levels "
-                    "(d1=%d, d3=%d) — using mechanical over chunked LLM.",
-                    mech_top, mech_d3,
-                )
-                return mech_result
-        return llm_result
 
     # --- Slow fallback: send raw markdown, ask for full JSON ---
     if not raw_toc_markdown or len(raw_toc_markdown) > 50000:
@@ -576,7 +813,7 @@ def _enrich_toc_from_raw_markdown_llm(
             text = text[start:end]
 
     try:
-        data = json.loads(text)
+        data = _json_loads(text)
     except json.JSONDecodeError as e:
         log.warning("LLM TOC response not valid JSON: %s", e)
         return None
@@ -613,6 +850,8 @@ def _content_start_after_contents(lines: list[str]) -> int:
     contents_heading_line = None
     contents_level = 999
     for i, line in enumerate(lines, start=1):
+        if line[:1] != "#":
+            continue
         m = HEADING_RE.match(line)
         if not m:
             continue
@@ -635,7 +874,7 @@ def _content_start_after_contents(lines: list[str]) -> int:
         if i == contents_heading_line - 1:
             continue
         line = lines[i]
-        if HEADING_RE.match(line):
+        if line[:1] == "#" and HEADING_RE.match(line):
             section_end = i + 1  # 1-based line of this heading
             break
     # First heading at same or shallower level after the section is the content start
@@ -643,6 +882,8 @@ def _content_start_after_contents(lines: list[str]) -> int:
         if i > len(lines):
             break
         line = lines[i - 1]  # i is 1-based
+        if line[:1] != "#":
+            continue
         m = HEADING_RE.match(line)
         if not m:
             continue
@@ -654,20 +895,25 @@ def _content_start_after_contents(lines: list[str]) -> int:
     return section_end
 
 
-def _toc_chapter_titles_from_table(lines: list[str]) -> list[str]:
+_NUMBERED_CHAPTER_RE = re.compile(r"^\d+\.\s+")
+
+
+def _toc_chapter_titles_from_table(
+    lines: list[str], bounds: tuple[int, int] | None | object = _BOUNDS_UNSET
+) -> list[str]:
     """
     Parse the Contents table and return normalized titles that are chapter-level
     (title starts with "N. " for integer N). Used to assign depth 1 to chapter headings.
     Returns list of normalized titles (lowercase, no leading "N. ") for matching.
     """
     chapter_titles = []
-    bounds = _contents_section_bounds(lines)
+    bounds = _resolve_contents_bounds(lines, bounds)
     if not bounds:
         return chapter_titles
     start_1, end_1 = bounds
     line_slice = lines[start_1 - 1 : end_1]
     for line in line_slice:
-        if not line.strip().startswith("|") or re.match(r"^\s*\|[-:| ]+\|\s*$", line):
+        if not line.strip().startswith("|") or TABLE_SEP_RE.match(line):
             continue
         m = TABLE_ROW_RE.match(line)
         if not m:
@@ -681,9 +927,10 @@ def _toc_chapter_titles_from_table(lines: list[str]) -> list[str]:
         if not title or len(title) < 3:
             continue
         # Chapter: starts with "N. " (single number and dot)
-        if re.match(r"^\d+\.\s+", title):
+        m = _NUMBERED_CHAPTER_RE.match(title)
+        if m:
             # Strip "1. " for matching body headings (which often omit the number)
-            core = re.sub(r"^\d+\.\s*", "", title).strip()
+            core = title[m.end():].strip()
             if core:
                 chapter_titles.append(core.lower())
     return chapter_titles
@@ -692,7 +939,81 @@ def _toc_chapter_titles_from_table(lines: list[str]) -> list[str]:
 _TRAILING_PAGE_RE = re.compile(r'^(.+?)\s+(\d+)\s*$')
 
 
-def parse_contents_table(lines: list[str]) -> list[tuple[str, int]]:
+def _parse_toc_table_row(line: str) -> tuple[str, int] | None:
+    """Format 1 of parse_contents_table: a markdown table row ``| N | Title | Page |``."""
+    if TABLE_SEP_RE.match(line):
+        return None
+    m = TABLE_ROW_RE.match(line)
+    if not m:
+        return None
+    content = m.group(1)
+    # Cells with HTML stripped, computed once: the page scan, the chapter-number
+    # guard and the title join below all read the cleaned text.
+    if "<" in content:
+        cells = [HTML_TAG_RE.sub("", c).strip() for c in content.split("|")]
+    else:
+        cells = [c.strip() for c in content.split("|")]
+    page = None
+    page_index = -1
+    for i in range(len(cells) - 1, -1, -1):
+        p_str = cells[i]
+        if not p_str:
+            continue
+        try:
+            page = int(p_str)
+            page_index = i
+            break
+        except ValueError:
+            pass
+        r_val = _roman_to_int(p_str)
+        if r_val is not None:
+            page = -r_val  # negative = Roman-numeral front-matter page
+            page_index = i
+            break
+    # Guard: if the "page" is in the first cell but there are text
+    # cells after it, it's actually a chapter number (e.g. | 1 | Title | | |).
+    if page is not None and page_index == 0:
+        if any(c and not c.isdigit() for c in cells[1:]):
+            page = None
+            page_index = -1
+    if page is not None:
+        title_parts = [c for c in cells[:page_index] if c]
+    else:
+        title_parts = [c for c in cells if c]
+        page = 0
+    if not title_parts:
+        return None
+    return (_normalize(" ".join(title_parts)), page)
+
+
+def _parse_toc_text_line(stripped: str) -> tuple[str, int] | None:
+    """Formats 2 and 3 of parse_contents_table: plain text / heading with a trailing
+    page number, or a heading with embedded ``#page-N`` links."""
+    heading_m = HEADING_RE.match(stripped) if stripped[:1] == "#" else None
+    text = heading_m.group(1).strip() if heading_m else stripped
+    if _CONTENTS_WORD_RE.search(text):
+        return None
+    if _RUNNING_HEADER_RE.match(text):
+        return None
+    m = _TRAILING_PAGE_RE.match(text)
+    if m:
+        title = _normalize(m.group(1))
+        if title and len(title) >= 2:
+            return (title, int(m.group(2)))
+        return None
+
+    page_link_m = _PAGE_LINK_RE.search(text)
+    if page_link_m:
+        clean = _MD_LINK_RE.sub(r"\1", text)
+        title = _normalize(clean)
+        if title and len(title) >= 2:
+            return (title, int(page_link_m.group(1)))
+    return None
+
+
+def parse_contents_table(
+    lines: list[str], bounds: tuple[int, int] | None | object = _BOUNDS_UNSET
+) -> list[tuple[str, int]]:
     """
     Parse TOC entries from the Contents section.  Handles two formats that
     low-quality OCR can produce in the same document:
@@ -707,7 +1028,7 @@ def parse_contents_table(lines: list[str]) -> list[tuple[str, int]]:
     should NOT have the Arabic-page offset applied during heading resolution.
     """
     rows: list[tuple[str, int]] = []
-    bounds = _contents_section_bounds(lines)
+    bounds = _resolve_contents_bounds(lines, bounds)
     if bounds:
         start_1, end_1 = bounds
         line_slice = lines[start_1 - 1 : end_1]
@@ -716,93 +1037,17 @@ def parse_contents_table(lines: list[str]) -> list[tuple[str, int]]:
 
     for line in line_slice:
         stripped = line.strip()
-        if not stripped:
-            continue
-        if PAGE_MARKER_RE.match(line):
-            continue
-
-        # --- Format 1: Markdown table row ---
-        if stripped.startswith("|"):
-            if re.match(r"^\s*\|[-:| ]+\|\s*$", line):
-                continue
-            m = TABLE_ROW_RE.match(line)
-            if not m:
-                continue
-            content = m.group(1)
-            cells = [c.strip() for c in content.split("|")]
-            if not cells:
-                continue
-            page = None
-            page_index = -1
-            for i in range(len(cells) - 1, -1, -1):
-                p_str = HTML_TAG_RE.sub("", cells[i]).strip()
-                if not p_str:
-                    continue
-                try:
-                    page = int(p_str)
-                    page_index = i
-                    break
-                except ValueError:
-                    pass
-                r_val = _roman_to_int(p_str)
-                if r_val is not None:
-                    page = -r_val  # negative = Roman-numeral front-matter page
-                    page_index = i
-                    break
-            # Guard: if the "page" is in the first cell but there are text
-            # cells after it, it's actually a chapter number (e.g. | 1 | Title | | |).
-            if page is not None and page_index == 0:
-                has_text_after = any(
-                    HTML_TAG_RE.sub("", cells[k]).strip()
-                    for k in range(1, len(cells))
-                    if not HTML_TAG_RE.sub("", cells[k]).strip().isdigit()
-                )
-                if has_text_after:
-                    page = None
-                    page_index = -1
-            if page is not None:
-                title_parts = []
-                for k in range(page_index):
-                    c_clean = HTML_TAG_RE.sub("", cells[k]).strip()
-                    if not c_clean:
-                        continue
-                    title_parts.append(c_clean)
-            else:
-                title_parts = [
-                    HTML_TAG_RE.sub("", c).strip()
-                    for c in cells if HTML_TAG_RE.sub("", c).strip()
-                ]
-                page = 0
-            if not title_parts:
-                continue
-            title = " ".join(title_parts)
-            title = _normalize(title)
-            rows.append((title, page))
-            continue
-
-        # --- Format 2: plain text or heading with trailing page number ---
-        heading_m = HEADING_RE.match(stripped)
-        text = heading_m.group(1).strip() if heading_m else stripped
-        if re.search(r'\bcontents\b', text, re.IGNORECASE):
-            continue
-        if _RUNNING_HEADER_RE.match(text):
-            continue
-        m = _TRAILING_PAGE_RE.match(text)
-        if m:
-            title = _normalize(m.group(1))
-            page = int(m.group(2))
-            if title and len(title) >= 2:
-                rows.append((title, page))
+        # Cheap prefilter: only table rows, lines ending in a page number, or lines
+        # with #page-N links can yield a row.  Blank lines, prose and {N}---- page
+        # markers are dropped here without running any regex.
+        if stripped[:1] == "|":
+            row = _parse_toc_table_row(line)
+        elif stripped[-1:].isdigit() or "#page-" in stripped:
+            row = _parse_toc_text_line(stripped)
+        else:
             continue
-
-        # --- Format 3: heading with embedded page links [text](#page-N-*) ---
-        page_link_m = re.search(r'#page-(\d+)', text)
-        if page_link_m:
-            page = int(page_link_m.group(1))
-            clean = re.sub(r'\[([^\]]*)\]\([^)]*\)', r'\1', text)
-            title = _normalize(clean)
-            if title and len(title) >= 2:
-                rows.append((title, page))
+        if row is not None:
+            rows.append(row)
 
     return rows
 
@@ -815,38 +1060,33 @@ def build_layout_model(meta_entries: list[dict]) -> dict:
     if not meta_entries:
         return {}
 
+    # Top-left corner of every polygon, read once (None when the entry has no polygon)
+    corners = [e["polygon"][0] if "polygon" in e else None for e in meta_entries]
+
     # 1. Identify running headers by Y coordinate (top of page)
-    # Cluster Y coordinates
-    y_values = sorted([e.get("polygon", [[0,0]])[0][1] for e in meta_entries])
     running_header_y_max = 55.0 # Default
     
     # Simple heuristic: Look for a gap in top Y values
     # If many items are at Y < 60, and then a gap to Y > 70
-    top_items = [y for y in y_values if y < 100]
-    if top_items:
-        # Find gap
-        for i in range(len(top_items) - 1):
-            if top_items[i+1] - top_items[i] > 15:
-                running_header_y_max = (top_items[i] + top_items[i+1]) / 2
-                break
+    # (only the Y values near the top are sorted; the rest are never looked at)
+    top_items = sorted(y for y in (c[1] if c is not None else 0 for c in corners) if y < 100)
+    gap = next(((a, b) for a, b in zip(top_items, top_items[1:]) if b - a > 15), None)
+    if gap:
+        running_header_y_max = (gap[0] + gap[1]) / 2
                 
     # 2. Cluster X coordinates for role assignment
-    # Filter out headers
-    body_entries = [e for e in meta_entries if e.get("polygon", [[0,999]])[0][1] > running_header_y_max]
-    
-    x_positions = sorted([e.get("polygon", [[0,0]])[0][0] for e in body_entries])
+    # Filter out headers (entries without a polygon count as body at x=0)
+    x_positions = sorted(
+        c[0] if c is not None else 0
+        for c in corners
+        if c is None or c[1] > running_header_y_max
+    )
     
-    # Cluster x_positions
-    bins = []
-    if x_positions:
-        current_bin = [x_positions[0]]
-        for x in x_positions[1:]:
-            if x - current_bin[-1] > 10:
-                bins.append(current_bin)
-                current_bin = [x]
-            else:
-                current_bin.append(x)
-        bins.append(current_bin)
+    # Cluster x_positions: split the sorted run wherever the gap exceeds 10
+    splits = [
+        i for i, (a, b) in enumerate(zip(x_positions, x_positions[1:]), start=1) if b - a > 10
+    ]
+    edges = [0, *splits, len(x_positions)] if x_positions else []
         
     # Assign roles to bins based on x-position (indentation)
     # Left-most -> Margin/Exercises? Or Section?
@@ -855,10 +1095,10 @@ def build_layout_model(meta_entries: list[dict]) -> dict:
     x_roles = []
     role_names = ["margin", "section", "subsection", "sub3", "sub4"]
     
-    for i, b in enumerate(bins):
-        avg = sum(b) / len(b)
-        min_x = min(b)
-        max_x = max(b)
+    # Each bin is a run of the sorted x_positions, so its min and max are its ends
+    for i, (lo, hi) in enumerate(zip(edges, edges[1:])):
+        min_x = x_positions[lo]
+        max_x = x_positions[hi - 1]
         role = role_names[min(i, len(role_names)-1)]
         x_roles.append((min_x - 5, max_x + 5, role))
         
@@ -884,11 +1124,40 @@ def classify_meta_entry(entry: dict, layout: dict) -> str:
 
     return "unknown"
 
-def _collect_annotations(meta_entries: list[dict], layout: dict) -> list[dict]:
-    """Collect entries classified as 'margin'."""
-    anns = []
+def _classify_meta_entries(meta_entries: list[dict], layout: dict) -> list[str]:
+    """Classify every meta entry in one pass; same result as classify_meta_entry per entry.
+
+    The x_roles bins from build_layout_model never overlap (clusters are > 10 apart,
+    padded by 5), so each x is placed by bisecting the bin lower bounds instead of
+    scanning every bin.
+    """
+    y_max = layout.get("running_header_y_max", 55)
+    x_roles = layout.get("x_roles", [])
+    lows = [lo for lo, _hi, _role in x_roles]
+    roles = []
     for e in meta_entries:
-        if classify_meta_entry(e, layout) == "margin":
+        poly = e.get("polygon")
+        if not poly or len(poly) < 2:
+            roles.append("unknown")
+            continue
+        x_left, y_top = poly[0][0], poly[0][1]
+        if y_top <= y_max:
+            roles.append("running_header")
+            continue
+        i = bisect.bisect_right(lows, x_left) - 1
+        roles.append(x_roles[i][2] if i >= 0 and x_left <= x_roles[i][1] else "unknown")
+    return roles
+
+def _collect_annotations(
+    meta_entries: list[dict], layout: dict, roles: list[str] | None = None
+) -> list[dict]:
+    """Collect entries classified as 'margin'. ``roles`` is _classify_meta_entries'
+    result when the caller already has it."""
+    if roles is None:
+        roles = _classify_meta_entries(meta_entries, layout)
+    anns = []
+    for e, role in zip(meta_entries, roles):
+        if role == "margin":
             anns.append({
                 "title": _normalize(e.get("title", "")),
                 "pdf_page": e.get("page_id")
@@ -899,40 +1168,113 @@ def _collect_annotations(meta_entries: list[dict], layout: dict) -> list[dict]:
 # Phase 3 & 4: Page Markers & Heading Location
 # ---------------------------------------------------------------------------
 
-def _build_page_marker_index(lines: list[str]) -> dict[int, int]:
-    """Map pdf_page → 1-based line number."""
-    idx = {}
+class _PageMarkerIndex(dict):
+    """pdf_page → 1-based marker line (exact hits), plus sorted parallel arrays for range queries.
+
+    Dict semantics are unchanged; ``lines_between`` answers "marker lines for pages
+    lo..hi" with two bisects over contiguous int arrays instead of probing every page.
+    """
+
+    def __init__(self, markers: dict[int, int]):
+        super().__init__(markers)
+        ordered = sorted(markers.items())
+        self.pages = array("i", (pg for pg, _ in ordered))
+        self.lines = array("i", (ln for _, ln in ordered))
+
+    def lines_between(self, first_page: int, last_page: int) -> array:
+        """Marker lines for every pdf page in [first_page, last_page] (inclusive)."""
+        lo = bisect.bisect_left(self.pages, first_page)
+        hi = bisect.bisect_right(self.pages, last_page)
+        return self.lines[lo:hi]
+
+
+def _scan_line_kinds(lines: list[str]) -> tuple[list[int], list[int]]:
+    """One pass: 1-based numbers of heading-candidate lines (first char ``#``) and of
+    page-marker lines.
+
+    The heading, page-marker and page-cache builders all accept these lists, so
+    build_index walks ``lines`` once instead of once per builder.  (A finditer over
+    the joined text, mapping offsets back to lines by bisect, measured slower:
+    building the text and offsets alone costs about what this loop does.)
+    """
+    heads: list[int] = []
+    markers: list[int] = []
     for i, line in enumerate(lines, start=1):
+        if line[:1] == "#":
+            heads.append(i)
+        elif "{" in line and PAGE_MARKER_RE.match(line):
+            markers.append(i)
+    return heads, markers
+
+
+def _build_page_marker_index(
+    lines: list[str], marker_lines: list[int] | None = None
+) -> _PageMarkerIndex:
+    """Map pdf_page → 1-based line number.
+
+    A marker line always contains ``{``; the substring test rejects body lines
+    before the regex engine is entered.  With ``marker_lines`` (from
+    _scan_line_kinds) only those lines are read.
+    """
+    idx = {}
+    candidates = range(1, len(lines) + 1) if marker_lines is None else marker_lines
+    for i in candidates:
+        line = lines[i - 1]
+        if "{" not in line:
+            continue
         m = PAGE_MARKER_RE.match(line)
         if m:
             pg = int(m.group(1))
             if pg not in idx:
                 idx[pg] = i
-    return idx
+    return _PageMarkerIndex(idx)
 
 
-def _build_page_cache(lines: list[str]) -> list[int]:
-    """One pass: line index 1..len(lines) -> pdf page at that line (0 if before first marker)."""
-    cache: list[int] = [0] * (len(lines) + 1)
-    current = 0
-    for i, line in enumerate(lines, start=1):
-        m = PAGE_MARKER_RE.match(line)
-        if m:
-            current = int(m.group(1))
-        cache[i] = current
+def _build_page_cache(
+    lines: list[str], marker_lines: list[int] | None = None
+) -> array | list[int]:
+    """Line index 1..len(lines) -> pdf page at that line (0 if before first marker).
+
+    Each run of lines between two markers is filled with one slice assignment.
+    Stored as a flat int array (4 bytes per line rather than a list slot plus
+    boxed int), since it spans every line of the book.
+    """
+    if marker_lines is None:
+        marker_lines = [
+            i for i, line in enumerate(lines, start=1)
+            if "{" in line and PAGE_MARKER_RE.match(line)
+        ]
+    n = len(lines)
+    pages = [int(PAGE_MARKER_RE.match(lines[i - 1]).group(1)) for i in marker_lines]
+    try:
+        cache = array("i", [0]) * (n + 1)
+        fill = [array("i", [pg]) for pg in pages]
+    except OverflowError:  # OCR garbage like {99999999999}----: keep Python ints
+        cache = [0] * (n + 1)
+        fill = [[pg] for pg in pages]
+    for k, i in enumerate(marker_lines):
+        nxt = marker_lines[k + 1] if k + 1 < len(marker_lines) else n + 1
+        cache[i:nxt] = fill[k] * (nxt - i)
     return cache
 
 
 def _page_at_line(
-    lines: list[str], line_1based: int, page_cache: list[int] | None = None
+    lines: list[str], line_1based: int, page_cache: array | None = None
 ) -> int:
-    """Page at this line. Use page_cache when available (O(1)); else scan backward (O(lines))."""
+    """Page at this line. Use page_cache when available (O(1)); else scan backward (O(lines)).
+
+    The backward scan is only for one-off callers; anything that looks up many lines
+    builds the cache once with _build_page_cache and passes it.
+    """
     if page_cache is not None:
         if 1 <= line_1based <= len(page_cache) - 1:
             return page_cache[line_1based]
         return 0
     for i in range(min(line_1based - 1, len(lines) - 1), -1, -1):
-        m = PAGE_MARKER_RE.match(lines[i])
+        line = lines[i]
+        if "{" not in line:
+            continue
+        m = PAGE_MARKER_RE.match(line)
         if m:
             return int(m.group(1))
     return 0
@@ -941,30 +1283,159 @@ def _page_at_line(
 _COLON_SPACE_RE = re.compile(r"\s+")
 
 
+@lru_cache(maxsize=8192)
 def _colon_norm(s: str) -> str:
     """Collapse whitespace and colons for Part-title matching."""
     return _COLON_SPACE_RE.sub(" ", s.replace(":", " ")).strip()
 
 
 # Pre-normalized heading record: avoids redoing regex per comparison.
-# (line_1based, raw_text, norm, core, core_no_part_cn, section_num)
-_HeadEntry = tuple[int, str, str, str, str, str | None]
+# (line_1based, raw_text, norm, core, core_no_part_cn, section_num, norm_no_part)
+# norm_no_part is norm without a leading "part " (None when there is none).
+_HeadEntry = tuple[int, str, str, str, str, str | None, str | None]
+
 
+class _HeadIndex(list):
+    """List of _HeadEntry in line order, plus ``starts``: their line numbers as a flat
+    int array, so range positioning is a bisect rather than a walk over tuples.
 
-def _build_heading_index(lines: list[str]) -> list[_HeadEntry]:
-    """One pass: pre-normalize every heading so match is pure string comparison."""
+    ``by_key()`` maps each normalized heading form to the positions carrying it, so a
+    title can be matched against every heading with a few dict lookups (_heads_matching).
+    """
+
+    def __init__(self, entries: list[_HeadEntry]):
+        super().__init__(entries)
+        self.starts = array("i", (e[0] for e in entries))
+        self._by_key: tuple[dict[str, list[int]], ...] | None = None
+
+    def by_key(self) -> tuple[dict[str, list[int]], ...]:
+        """(by_core, by_core_no_part_cn, by_norm, by_norm_no_part), built on first use."""
+        if self._by_key is None:
+            by_core: dict[str, list[int]] = {}
+            by_cn: dict[str, list[int]] = {}
+            by_norm: dict[str, list[int]] = {}
+            by_nnp: dict[str, list[int]] = {}
+            for i, (_line, _raw, h_norm, h_core, h_cn, _sec, h_nnp) in enumerate(self):
+                if h_core:
+                    by_core.setdefault(h_core, []).append(i)
+                if h_cn:
+                    by_cn.setdefault(h_cn, []).append(i)
+                by_norm.setdefault(h_norm, []).append(i)
+                if h_nnp is not None:
+                    by_nnp.setdefault(h_nnp, []).append(i)
+            self._by_key = (by_core, by_cn, by_norm, by_nnp)
+        return self._by_key
+
+
+def _head_starts(head_index: list[_HeadEntry]) -> array:
+    """Line numbers of ``head_index`` entries (cached on a _HeadIndex)."""
+    if isinstance(head_index, _HeadIndex):
+        return head_index.starts
+    return array("i", (e[0] for e in head_index))
+
+
+def _build_heading_index(
+    lines: list[str], heading_lines: list[int] | None = None
+) -> _HeadIndex:
+    """One pass: pre-normalize every heading so match is pure string comparison.
+
+    ``heading_lines`` (from _scan_line_kinds) restricts the pass to '#' lines.
+    Normalized forms are interned, as are _title_match_key's, so a matching pair
+    compares by identity.
+    """
     out: list[_HeadEntry] = []
-    for i, line in enumerate(lines, start=1):
-        m = HEADING_RE.match(line)
+    heading_match = HEADING_RE.match
+    candidates = range(1, len(lines) + 1) if heading_lines is None else heading_lines
+    for i in candidates:
+        line = lines[i - 1]
+        if line[:1] != "#":  # HEADING_RE is anchored on '#'; skip body lines cheaply
+            continue
+        m = heading_match(line)
         if not m:
             continue
         raw = m.group(1).strip()
-        h_norm = _normalize(raw).lower()
-        h_core = _strip_section_num(h_norm)
-        h_core_no_part = h_core[5:].strip() if h_core.startswith("part ") else h_core
-        h_core_no_part_cn = _colon_norm(h_core_no_part)
-        sec_num = _section_num(raw)
-        out.append((i, raw, h_norm, h_core, h_core_no_part_cn, sec_num))
+        out.append((i, raw, *_heading_forms(raw)))
+    return _HeadIndex(out)
+
+
+@lru_cache(maxsize=8192)
+def _heading_forms(raw: str) -> tuple[str, str, str, str | None, str | None]:
+    """(norm, core, core_no_part_cn, section_num, norm_no_part) of a heading's text,
+    i.e. _HeadEntry after (line, raw).  Memoized: books repeat heading texts (running
+    heads, "Exercises", "Summary"), and the no-index scans re-read headings.
+    """
+    h_norm = sys.intern(_normalize(raw).lower())
+    h_core = sys.intern(_strip_section_num(h_norm))
+    h_core_no_part = h_core[5:].strip() if h_core.startswith("part ") else h_core
+    h_core_no_part_cn = sys.intern(_colon_norm(h_core_no_part))
+    h_norm_no_part = sys.intern(h_norm[5:].strip()) if h_norm.startswith("part ") else None
+    return (h_norm, h_core, h_core_no_part_cn, _section_num(raw), h_norm_no_part)
+
+
+_LEADING_LETTER_RE = re.compile(r"^[a-z]\s+")
+
+# TOC-side counterpart of _HeadEntry:
+# (norm, core, core_no_letter, core_cn, section_num)
+_TitleKey = tuple[str, str, str, str, str | None]
+
+
+@lru_cache(maxsize=4096)
+def _title_match_key(title: str) -> _TitleKey:
+    """Every normalized form of a TOC title that heading matching compares against.
+
+    Memoized: _locate_heading may try the same title in a narrow and a full range,
+    and the candidate search normalizes it again.
+    """
+    norm = sys.intern(_normalize(title).lower())
+    norm_core = sys.intern(_strip_section_num(norm))
+    norm_core_no_letter = _LEADING_LETTER_RE.sub("", norm_core) if len(norm_core) > 2 else norm_core
+    n_core_cn = _colon_norm(norm_core) if norm_core else ""
+    return (
+        norm,
+        norm_core,
+        sys.intern(norm_core_no_letter),
+        sys.intern(n_core_cn),
+        _section_num(title),
+    )
+
+
+# Below this many headings in range a straight walk beats the key lookups.
+_HEAD_WALK_MAX = 48
+
+
+def _heads_matching(head_index: _HeadIndex, key: _TitleKey, lo: int, hi: int) -> list[int]:
+    """Positions in [lo, hi) of ``head_index`` whose heading matches the title ``key``,
+    ascending — the same set the match walk in _find_heading_in_range accepts, found
+    by looking each condition up in ``head_index.by_key()``.
+    """
+    norm, norm_core, norm_core_no_letter, n_core_cn, title_section_num = key
+    by_core, by_cn, by_norm, by_nnp = head_index.by_key()
+    found: set[int] = set()
+    if norm_core:
+        found.update(by_core.get(norm_core, ()))
+    if n_core_cn:
+        found.update(by_cn.get(n_core_cn, ()))
+    if norm_core_no_letter:
+        found.update(by_core.get(norm_core_no_letter, ()))
+    found.update(by_norm.get(norm, ()))
+    # Heading core that is a word prefix (> 3 chars) of the title core
+    k = norm_core.find(" ", 4)
+    while k != -1:
+        found.update(by_core.get(norm_core[:k], ()))
+        k = norm_core.find(" ", k + 1)
+    found.update(by_nnp.get(norm, ()))
+    # "part ..." heading that is a prefix of the title
+    if norm.startswith("part "):
+        for k in range(5, len(norm) + 1):
+            found.update(by_norm.get(norm[:k], ()))
+    out = []
+    for i in found:
+        if lo <= i < hi:
+            h_secnum = head_index[i][5]
+            if title_section_num and h_secnum and title_section_num != h_secnum:
+                continue
+            out.append(i)
+    out.sort()
     return out
 
 
@@ -980,26 +1451,30 @@ def _find_heading_in_range(
     Find heading matching title in range. Returns (match_line, next_head_start_index).
     When head_index is provided, only scan from head_start_index (progressive).
     """
-    norm = _normalize(title).lower()
-    norm_core = _strip_section_num(norm)
-    norm_core_no_letter = re.sub(r"^[a-z]\s+", "", norm_core) if len(norm_core) > 2 else norm_core
+    norm, norm_core, norm_core_no_letter, n_core_cn, title_section_num = _title_match_key(title)
     range_start = max(1, range_start)
     range_end = min(len(lines), range_end)
-    title_section_num = _section_num(title)
-    n_core_cn = _colon_norm(norm_core) if norm_core else ""
 
     if head_index:
-        # Use bisect to jump straight to first heading >= range_start
-        lo = head_start_index
-        hi_bound = len(head_index)
-        # Advance lo to first entry with line_1based >= range_start
-        while lo < hi_bound and head_index[lo][0] < range_start:
-            lo += 1
-        for i in range(lo, hi_bound):
-            line_1based, _raw, h_norm, h_core, h_core_no_part_cn, h_secnum = head_index[i]
-            if line_1based > range_end:
-                # Don't advance past this — caller may need these headings for a wider range
-                return (None, lo)
+        # Bisect to the headings in [range_start, range_end]; on a miss, don't advance
+        # past lo — the caller may need these headings for a wider range.
+        starts = _head_starts(head_index)
+        lo = bisect.bisect_left(starts, range_start, head_start_index)
+        hi = bisect.bisect_right(starts, range_end, lo)
+        if hi - lo > _HEAD_WALK_MAX and isinstance(head_index, _HeadIndex):
+            hits = _heads_matching(
+                head_index,
+                (norm, norm_core, norm_core_no_letter, n_core_cn, title_section_num),
+                lo,
+                hi,
+            )
+            if hits:
+                return (head_index[hits[0]][0], hits[0] + 1)
+            return (None, lo)
+        for i in range(lo, hi):
+            (
+                line_1based, _raw, h_norm, h_core, h_core_no_part_cn, h_secnum, h_norm_no_part
+            ) = head_index[i]
             if title_section_num and h_secnum and title_section_num != h_secnum:
                 continue
             if norm_core and h_core and norm_core == h_core:
@@ -1013,27 +1488,24 @@ def _find_heading_in_range(
             # TOC "INTRODUCTION Why This..." matches heading "INTRODUCTION" (prefix)
             if h_core and norm_core.startswith(h_core + " ") and len(h_core) > 3:
                 return (line_1based, i + 1)
-            if h_norm.startswith("part ") and norm == h_norm[5:].strip():
+            if h_norm_no_part is not None and norm == h_norm_no_part:
                 return (line_1based, i + 1)
             # Body "PART I" matches TOC "PART I Subtitle..." (prefix match)
-            if h_norm.startswith("part ") and norm.startswith(h_norm):
+            if h_norm_no_part is not None and norm.startswith(h_norm):
                 return (line_1based, i + 1)
         return (None, lo)
 
     # Fallback without index (shouldn't be needed in normal flow)
     for i in range(range_start - 1, range_end):
         line = lines[i]
+        if line[:1] != "#":
+            continue
         m = HEADING_RE.match(line)
         if not m:
             continue
-        h_text = m.group(1).strip()
-        h_norm = _normalize(h_text).lower()
-        h_core = _strip_section_num(h_norm)
-        h_secnum = _section_num(h_text)
+        h_norm, h_core, h_core_no_part_cn, h_secnum, _nnp = _heading_forms(m.group(1).strip())
         if title_section_num and h_secnum and title_section_num != h_secnum:
             continue
-        h_core_no_part = h_core[5:].strip() if h_core.startswith("part ") else h_core
-        h_core_no_part_cn = _colon_norm(h_core_no_part)
         if norm_core and h_core and norm_core == h_core:
             return (i + 1, 0)
         if n_core_cn and h_core_no_part_cn and n_core_cn == h_core_no_part_cn:
@@ -1057,14 +1529,10 @@ def _heading_level_at_line(lines: list[str], line_1based: int) -> int | None:
     if line_1based < 1 or line_1based > len(lines):
         return None
     line = lines[line_1based - 1]
-    m = HEADING_RE.match(line)
-    if not m:
+    if line[:1] != "#" or not HEADING_RE.match(line):
         return None
-    # Count leading # (group 0 is full match; we need just the # part)
-    i = 0
-    while i < len(line) and line[i] == "#":
-        i += 1
-    return i if 1 <= i <= 6 else None
+    # HEADING_RE only matches 1-6 leading '#', so the count is already in range
+    return len(line) - len(line.lstrip("#"))
 
 
 def _heading_title_from_line(line: str) -> tuple[str, int | None]:
@@ -1093,6 +1561,59 @@ def _page_from_heading_line(line: str) -> int | None:
     return int(m.group(1)) if m else None
 
 
+_CHAPTER_KEY_RE = re.compile(r"[–\-—\s]+")
+
+
+@lru_cache(maxsize=4096)
+def _chapter_key(s: str) -> str:
+    """Comparison key for chapter-title matching: normalized, lowercased, dashes and
+    whitespace runs collapsed to one space."""
+    return _CHAPTER_KEY_RE.sub(" ", _normalize(s).lower()).strip()
+
+
+class _ChapterKeys(set):
+    """Set of chapter keys with an index for the prefix rule used when matching a
+    heading key ``t`` against them: ``t`` matches ``ck`` when they are equal, when
+    ``ck`` is a prefix of ``t``, or when ``t`` is a prefix of ``ck`` covering at
+    least 85% of it.
+
+    "ck is a prefix of t" is one set lookup per distinct key length below
+    ``len(t)``; keys having ``t`` as a prefix form one contiguous run of the sorted
+    keys, found by bisect, and that run is only walked when some key length falls
+    in the 85% window ``(len(t), len(t) / 0.85]``.
+    """
+
+    def __init__(self, keys):
+        super().__init__(keys)
+        self.sorted = sorted(self)
+        self.lengths = sorted({len(k) for k in self})
+
+    def matches(self, t: str) -> bool:
+        if not t:
+            return False
+        if t in self:
+            return True
+        lengths = self.lengths
+        lt = len(t)
+        for n in lengths:
+            if n >= lt:
+                break
+            if t[:n] in self:
+                return True
+        # Shortest key longer than t; if even that is out of the window, all are.
+        j = bisect.bisect_right(lengths, lt)
+        if j == len(lengths) or lt < 0.85 * lengths[j]:
+            return False
+        keys = self.sorted
+        for i in range(bisect.bisect_left(keys, t), len(keys)):
+            ck = keys[i]
+            if not ck.startswith(t):
+                break
+            if len(t) >= 0.85 * len(ck):
+                return True
+        return False
+
+
 def _title_matches_chapter(title_normalized: str, chapter_titles: list[str]) -> bool:
     """
     True only when the heading is the full TOC chapter title (match on actual header).
@@ -1102,14 +1623,11 @@ def _title_matches_chapter(title_normalized: str, chapter_titles: list[str]) ->
     if not title_normalized or not chapter_titles:
         return False
 
-    def _key(s: str) -> str:
-        return re.sub(r"[–\-—\s]+", " ", _normalize(s).lower()).strip()
-
-    t = _key(title_normalized)
+    t = _chapter_key(title_normalized)
     if not t:
         return False
     for ct in chapter_titles:
-        c = _key(ct)
+        c = _chapter_key(ct)
         if not c:
             continue
         if t == c:
@@ -1131,19 +1649,26 @@ SECTION_NUMBER_RE = re.compile(
     r")",
     re.IGNORECASE
 )
+_PAGE_HEADER_NUM_RE = re.compile(r"^\d+\s+\d+")
+_SECTION_WORD_RE = re.compile(r"^Section\s", re.IGNORECASE)
+_BARE_CHAPTER_REF_RE = re.compile(r"^(?:Chapter|Appendix|Part)\s+[\dIVXivx]+\s*$", re.IGNORECASE)
+_DOTTED_NUM_RE = re.compile(r"^(\d+(?:\.\d+)+)")  # Must have at least one dot
+_NUM_THEN_WORD_RE = re.compile(r"^(\d+)\s+[A-Z]")
+_APPENDIX_NUM_RE = re.compile(r"^[A-Z]\.(\d+(?:\.\d+)*)")
+_DIVISION_WORD_RE = re.compile(r"^(?:Chapter|Section|Part|Appendix)\s+[\dIVXivx]+", re.IGNORECASE)
 
 
 def _has_section_number(title: str) -> bool:
     """Check if title starts with a section number pattern like 1.1 Title, Chapter 1."""
     title = title.strip()
     # Reject if starts with a bare number followed by another number (e.g., "66 1. INTRO" is page header noise)
-    if re.match(r"^\d+\s+\d+", title):
+    if _PAGE_HEADER_NUM_RE.match(title):
         return False
     # Reject anything starting with "Section" - these are cross-references, not headings
-    if re.match(r"^Section\s", title, re.IGNORECASE):
+    if _SECTION_WORD_RE.match(title):
         return False
     # Reject "Chapter N" / "Appendix X" without any title (just a reference)
-    if re.match(r"^(?:Chapter|Appendix|Part)\s+[\dIVXivx]+\s*$", title, re.IGNORECASE):
+    if _BARE_CHAPTER_REF_RE.match(title):
         return False
     return bool(SECTION_NUMBER_RE.match(title))
 
@@ -1155,25 +1680,31 @@ def _extract_section_depth_from_number(title: str) -> int | None:
     """
     title = title.strip()
     # Match numeric patterns like 1.1, 2.3.4
-    m = re.match(r"^(\d+(?:\.\d+)+)", title)  # Must have at least one dot
+    m = _DOTTED_NUM_RE.match(title)
     if m:
         parts = m.group(1).split(".")
         return len(parts)
     # Match single digit followed by word (chapter-level): "1 Introduction"
-    m = re.match(r"^(\d+)\s+[A-Z]", title)
+    m = _NUM_THEN_WORD_RE.match(title)
     if m:
         return 1
     # Match appendix patterns like A.1, B.2.3
-    m = re.match(r"^[A-Z]\.(\d+(?:\.\d+)*)", title)
+    m = _APPENDIX_NUM_RE.match(title)
     if m:
         return len(m.group(1).split(".")) + 1
     # Chapter/Section/Part -> depth 1
-    if re.match(r"^(?:Chapter|Section|Part|Appendix)\s+[\dIVXivx]+", title, re.IGNORECASE):
+    if _DIVISION_WORD_RE.match(title):
         return 1
     return None
 
 
-def build_index_from_headings(lines: list[str]) -> list[dict]:
+def build_index_from_headings(
+    lines: list[str],
+    toc_bounds: tuple[int, int] | None | object = _BOUNDS_UNSET,
+    heading_lines: list[int] | None = None,
+    marker_lines: list[int] | None = None,
+    page_cache: array | None = None,
+) -> list[dict]:
     """
     Build a section index purely from markdown headings (#–######).
     Use when TOC/meta pipeline yields broken ranges (e.g. missing pages / wrong line ranges).
@@ -1182,26 +1713,23 @@ def build_index_from_headings(lines: list[str]) -> list[dict]:
     numbered sections. Otherwise includes all headings.
     """
     content_start = _content_start_after_contents(lines)
-    chapter_titles = _toc_chapter_titles_from_table(lines)
+    chapter_titles = _toc_chapter_titles_from_table(lines, bounds=toc_bounds)
     # Pre-normalize chapter titles once
-    chapter_keys = set()
-    _key_re = re.compile(r"[–\-—\s]+")
-    for ct in chapter_titles:
-        k = _key_re.sub(" ", _normalize(ct).lower()).strip()
-        if k:
-            chapter_keys.add(k)
-    pc = _build_page_cache(lines)
+    chapter_keys = _ChapterKeys(k for k in map(_chapter_key, chapter_titles) if k)
+    pc = page_cache if page_cache is not None else _build_page_cache(lines, marker_lines)
 
     # First pass: collect all headings and check for numbering pattern
     all_headings: list[tuple[int, int, str, int | None]] = []  # (line, level, title, pdf_page)
-    for i, line in enumerate(lines, start=1):
-        if i < content_start:
-            continue
-        if not HEADING_RE.match(line):
+    heading_match = HEADING_RE.match
+    if heading_lines is None:
+        candidates = range(content_start, len(lines) + 1)
+    else:
+        candidates = heading_lines[bisect.bisect_left(heading_lines, content_start):]
+    for i in candidates:
+        line = lines[i - 1]
+        if line[:1] != "#" or not heading_match(line):
             continue
-        level = 0
-        while level < len(line) and line[level] == "#":
-            level += 1
+        level = len(line) - len(line.lstrip("#"))
         if level > 6:
             continue
         title, pdf_page = _heading_title_from_line(line)
@@ -1225,13 +1753,7 @@ def build_index_from_headings(lines: list[str]) -> list[dict]:
         if use_numbered_filter and not _has_section_number(title):
             continue
         
-        title_key = _key_re.sub(" ", _normalize(title).lower()).strip()
-        is_chapter = title_key in chapter_keys
-        if not is_chapter:
-            for ck in chapter_keys:
-                if len(title_key) >= 0.85 * len(ck) and (title_key == ck[:len(title_key)] or ck == title_key[:len(ck)]):
-                    is_chapter = True
-                    break
+        is_chapter = chapter_keys.matches(_chapter_key(title))
         
         # Determine depth: prefer section number depth, else markdown level, else chapter match
         if use_numbered_filter:
@@ -1251,30 +1773,34 @@ def build_index_from_headings(lines: list[str]) -> list[dict]:
             "depth": depth,
             "pdf_page": pdf_page if pdf_page is not None else _page_at_line(lines, line_num, pc),
             "md_start_line": line_num,
-            "_fallback_end": len(lines),
             "children": [],
         }
         nodes.append(node)
 
-    _assign_depths_and_parents(nodes)
-    for i, node in enumerate(nodes):
-        end_page = _page_at_line(lines, node["md_end_line"], pc)
-        if end_page == 0 and i + 1 < len(nodes):
-            next_start = nodes[i + 1].get("pdf_page")
-            if next_start and next_start > 0:
-                end_page = next_start - 1
-        if end_page == 0 and node.get("pdf_page"):
-            end_page = node["pdf_page"]
-        node["pdf_page_end"] = end_page
+    _assign_depths_and_parents(nodes, len(lines))
+    _assign_flat_page_ends(nodes, lines, pc)
     return nodes
 
 
+def _assign_flat_page_ends(nodes: list[dict], lines: list[str], page_cache: array) -> None:
+    """pdf_page_end for document-ordered nodes with md_end_line set: the page at the
+    end line, else the page before the next node's start, else the node's own page."""
+    pages = [n.get("pdf_page") for n in nodes]
+    for node, start, next_start in zip(nodes, pages, pages[1:] + [None]):
+        end_page = _page_at_line(lines, node["md_end_line"], page_cache)
+        if end_page == 0 and next_start and next_start > 0:
+            end_page = next_start - 1
+        if end_page == 0 and start:
+            end_page = start
+        node["pdf_page_end"] = end_page
+
+
 def _find_all_heading_candidates(
     lines: list[str],
     title: str,
     range_start: int,
     range_end: int,
-    head_index: list[tuple[int, str, str, str, str, str | None]] | None = None,
+    head_index: list[_HeadEntry] | None = None,
     head_start_index: int = 0,
 ) -> list[int]:
     """
@@ -1282,20 +1808,24 @@ def _find_all_heading_candidates(
     Returns list of line numbers (1-based).
     """
     candidates = []
-    norm = _normalize(title).lower()
-    norm_core = _strip_section_num(norm)
-    norm_core_no_letter = re.sub(r"^[a-z]\s+", "", norm_core) if len(norm_core) > 2 else norm_core
-    n_core_cn = _colon_norm(norm_core)
-    title_section_num = _section_num(title)
+    norm, norm_core, norm_core_no_letter, n_core_cn, title_section_num = _title_match_key(title)
     
     if head_index:
-        lo = head_start_index
-        for i in range(lo, len(head_index)):
-            line_1based, h_raw, h_norm, h_core, h_core_no_part_cn, h_secnum = head_index[i]
-            if line_1based < range_start:
-                continue
-            if line_1based >= range_end:
-                break
+        starts = _head_starts(head_index)
+        lo = bisect.bisect_left(starts, range_start, head_start_index)
+        hi = bisect.bisect_left(starts, range_end, head_start_index)
+        if hi - lo > _HEAD_WALK_MAX and isinstance(head_index, _HeadIndex):
+            hits = _heads_matching(
+                head_index,
+                (norm, norm_core, norm_core_no_letter, n_core_cn, title_section_num),
+                lo,
+                hi,
+            )
+            return [head_index[i][0] for i in hits]
+        for i in range(lo, hi):
+            (
+                line_1based, h_raw, h_norm, h_core, h_core_no_part_cn, h_secnum, h_norm_no_part
+            ) = head_index[i]
             if title_section_num and h_secnum and title_section_num != h_secnum:
                 continue
             # Check all match conditions
@@ -1310,9 +1840,9 @@ def _find_all_heading_candidates(
                 matched = True
             elif h_core and norm_core.startswith(h_core + " ") and len(h_core) > 3:
                 matched = True
-            elif h_norm.startswith("part ") and norm == h_norm[5:].strip():
+            elif h_norm_no_part is not None and norm == h_norm_no_part:
                 matched = True
-            elif h_norm.startswith("part ") and norm.startswith(h_norm):
+            elif h_norm_no_part is not None and norm.startswith(h_norm):
                 matched = True
             
             if matched:
@@ -1322,17 +1852,14 @@ def _find_all_heading_candidates(
     # Fallback without index
     for i in range(range_start - 1, range_end):
         line = lines[i]
+        if line[:1] != "#":
+            continue
         m = HEADING_RE.match(line)
         if not m:
             continue
-        h_text = m.group(1).strip()
-        h_norm = _normalize(h_text).lower()
-        h_core = _strip_section_num(h_norm)
-        h_secnum = _section_num(h_text)
+        h_norm, h_core, h_core_no_part_cn, h_secnum, _nnp = _heading_forms(m.group(1).strip())
         if title_section_num and h_secnum and title_section_num != h_secnum:
             continue
-        h_core_no_part = h_core[5:].strip() if h_core.startswith("part ") else h_core
-        h_core_no_part_cn = _colon_norm(h_core_no_part)
         
         matched = False
         if norm_core and h_core and norm_core == h_core:
@@ -1356,37 +1883,44 @@ def _find_all_heading_candidates(
     return candidates
 
 
+def _next_head_after(
+    head_index: list[_HeadEntry] | None, line_1based: int, head_start_index: int
+) -> int:
+    """Index of the first heading after ``line_1based`` (from head_start_index), or
+    head_start_index when there is none."""
+    if not head_index:
+        return head_start_index
+    i = bisect.bisect_right(_head_starts(head_index), line_1based, head_start_index)
+    return i if i < len(head_index) else head_start_index
+
+
 def _locate_heading(
     lines: list[str],
     title: str,
     pdf_page: int | None,
-    page_markers: dict[int, int],
+    page_markers: _PageMarkerIndex,
     search_after_line: int = 0,
     head_index: list[tuple[int, str]] | None = None,
     head_start_index: int = 0,
+    page_cache: array | None = None,
 ) -> tuple[int | None, int]:
     """
     Find the markdown heading for a TOC title. Returns (match_line or None, next_head_start_index).
     When multiple candidates exist, picks the one closest to pdf_page hint.
     Search is progressive: only considers headings at or after search_after_line.
+    Pass the caller's ``page_cache`` when locating many titles; otherwise it is
+    rebuilt (one full pass over ``lines``) on every call.
     """
     range_start = max(1, search_after_line + 1)
     range_end = len(lines)
-    page_cache = _build_page_cache(lines) if page_markers else None
+    if page_cache is None and page_markers:
+        page_cache = _build_page_cache(lines)
 
     # First try narrow range near expected page
     if pdf_page is not None and page_markers:
-        raw_starts = [
-            page_markers[pg]
-            for pg in range(pdf_page - 3, pdf_page + 2)
-            if pg in page_markers
-        ]
+        raw_starts = page_markers.lines_between(pdf_page - 3, pdf_page + 1)
         search_start = max(min(raw_starts), range_start) if raw_starts else range_start
-        ends = [
-            page_markers[pg]
-            for pg in range(pdf_page + 2, pdf_page + 5)
-            if pg in page_markers
-        ]
+        ends = page_markers.lines_between(pdf_page + 2, pdf_page + 4)
         search_end = max(ends) if ends else range_end
         found, next_i = _find_heading_in_range(
             lines, title, search_start, search_end,
@@ -1407,13 +1941,7 @@ def _locate_heading(
     if len(candidates) == 1:
         # Only one match - use it
         chosen = candidates[0]
-        next_i = head_start_index
-        if head_index:
-            for i in range(head_start_index, len(head_index)):
-                if head_index[i][0] > chosen:
-                    next_i = i
-                    break
-        return (chosen, next_i)
+        return (chosen, _next_head_after(head_index, chosen, head_start_index))
     
     # Multiple candidates: score by distance from expected page + title match quality
     best = None
@@ -1440,7 +1968,9 @@ def _locate_heading(
         # Title complexity: prefer shorter/simpler headings when they match
         # (e.g. "CHAPTER 1" vs "CHAPTER 1: LIFE IS POKER...")
         cand_heading_line = lines[cand_line - 1] if cand_line <= len(lines) else ""
-        cand_heading_text = HEADING_RE.match(cand_heading_line)
+        cand_heading_text = (
+            HEADING_RE.match(cand_heading_line) if cand_heading_line[:1] == "#" else None
+        )
         if cand_heading_text:
             cand_title = cand_heading_text.group(1).strip()
             # Penalize longer titles slightly (NOTES section has full verbose titles)
@@ -1457,14 +1987,9 @@ def _locate_heading(
             best_score = score
             best = cand_line
     
-    next_i = head_start_index
-    if head_index and best:
-        for i in range(head_start_index, len(head_index)):
-            if head_index[i][0] > best:
-                next_i = i
-                break
-    
-    return (best, next_i)
+    if not best:
+        return (best, head_start_index)
+    return (best, _next_head_after(head_index, best, head_start_index))
 
 # ---------------------------------------------------------------------------
 # Offset and Meta Page
@@ -1474,75 +1999,174 @@ def _build_meta_page_lookup(
     meta_entries: list[dict], layout: dict
 ) -> dict[str, int]:
     """Pre-build dict from normalized title (and core title) → page_id. One-time O(M) pass."""
+    return _scan_meta_entries(meta_entries, layout)[0]
+
+
+def _scan_meta_entries(
+    meta_entries: list[dict], layout: dict, roles: list[str] | None = None
+) -> tuple[dict[str, int], list[tuple[str, int]]]:
+    """One pass over the meta TOC: (page lookup as in _build_meta_page_lookup,
+    deduplicated (title, page_id) rows for use as the TOC when the markdown has none).
+
+    The rows keep every entry with a title and page (no role filter); the lookup
+    only section-like roles.  ``roles`` is _classify_meta_entries' result when the
+    caller already has it.
+    """
+    if roles is None:
+        roles = _classify_meta_entries(meta_entries, layout)
     by_norm: dict[str, int] = {}
     by_core: dict[str, int] = {}
-    for e in meta_entries:
-        role = classify_meta_entry(e, layout)
-        if role in ("running_header", "margin", "unknown"):
-            continue
+    seen: set[tuple[str, int]] = set()
+    meta_parsed: list[tuple[str, int]] = []
+    for e, role in zip(meta_entries, roles):
         page_id = e.get("page_id")
         if page_id is None:
             continue
-        mt = _normalize(e.get("title") or "").lower()
+        raw = e.get("title") or ""
+        raw_title = raw.strip().replace("\n", " ")
+        if len(raw_title) >= 2:
+            title = _normalize(raw_title)
+            if title:
+                key = (title, page_id)
+                if key not in seen:
+                    seen.add(key)
+                    meta_parsed.append(key)
+        if role in ("running_header", "margin", "unknown"):
+            continue
+        mt = sys.intern(_normalize(raw).lower())
         if mt and mt not in by_norm:
             by_norm[mt] = page_id
-        mt_core = _strip_section_num(mt)
+        mt_core = sys.intern(_strip_section_num(mt))
         if mt_core and mt_core not in by_core:
             by_core[mt_core] = page_id
     # Merge: exact full title takes priority, then core
     merged: dict[str, int] = {}
     merged.update(by_core)
     merged.update(by_norm)
-    return merged
+    return merged, meta_parsed
 
 
 def _meta_pdf_page_for_fast(title: str, meta_lookup: dict[str, int]) -> int | None:
-    """O(1) lookup in pre-built meta dict."""
+    """O(1) lookup in pre-built meta dict.
+
+    The title's normalized and core forms come from _title_match_key, memoized per
+    title and interned like the lookup's keys, so the repeated lookups for a TOC row
+    (corruption check, offset, page hint, validation) normalize it only once.
+    """
     if not meta_lookup:
         return None
-    norm = _normalize(title).lower()
+    norm, norm_core = _title_match_key(title)[:2]
     page = meta_lookup.get(norm)
     if page is not None:
         return page
-    norm_core = _strip_section_num(norm)
     return meta_lookup.get(norm_core)
 
 
+# (normalized title, core title, page_id) for a classified section/subsection meta entry.
+_MetaMatchEntry = tuple[str, str, int | None]
+
+
+class _MetaMatchEntries(list):
+    """List of _MetaMatchEntry in meta order, plus:
+
+    - ``first_full`` / ``first_core``: first position of each title / non-empty core,
+      so the exact checks in _meta_pdf_page_for are dict lookups;
+    - the positions of the fuzzy-eligible entries (core longer than 5 chars) ordered
+      by core length, so its fuzzy pass only visits cores of a length that can score
+      above the cutoff.
+    """
+
+    def __init__(self, entries: list[_MetaMatchEntry]):
+        super().__init__(entries)
+        self.first_full: dict[str, int] = {}
+        self.first_core: dict[str, int] = {}
+        for i, (mt, mt_core, _page) in enumerate(entries):
+            self.first_full.setdefault(mt, i)
+            if mt_core:
+                self.first_core.setdefault(mt_core, i)
+        by_len = sorted(
+            (len(mt_core), i) for i, (_mt, mt_core, _page) in enumerate(entries)
+            if len(mt_core) > 5
+        )
+        self.core_lens = array("i", (n for n, _ in by_len))
+        self.len_positions = [i for _, i in by_len]
+
+    def exact_position(self, norm: str, norm_core: str) -> int | None:
+        """First position whose title equals ``norm`` or whose core equals ``norm_core``."""
+        i = self.first_full.get(norm)
+        j = self.first_core.get(norm_core) if norm_core else None
+        if i is None:
+            return j
+        return i if j is None else min(i, j)
+
+    def fuzzy_positions(self, n: int) -> list[int]:
+        """Positions, in meta order, whose core length is within the 0.8 ratio of ``n``
+        (with a char of slack either side; the caller still checks the score).
+        """
+        lo = bisect.bisect_left(self.core_lens, (4 * n) // 5)
+        hi = bisect.bisect_right(self.core_lens, (5 * n) // 4 + 1)
+        return sorted(self.len_positions[lo:hi])
+
+
+def _build_meta_match_entries(meta_entries: list[dict], layout: dict) -> _MetaMatchEntries:
+    """Classify and normalize meta entries once, for repeated _meta_pdf_page_for calls."""
+    out: list[_MetaMatchEntry] = []
+    for e, role in zip(meta_entries, _classify_meta_entries(meta_entries, layout)):
+        if role in ("running_header", "margin", "unknown"):
+            continue
+        mt = sys.intern(_normalize(e.get("title") or "").lower())
+        out.append((mt, sys.intern(_strip_section_num(mt)), e.get("page_id")))
+    return _MetaMatchEntries(out)
+
+
 def _meta_pdf_page_for(
-    title: str, meta_entries: list[dict], layout: dict
+    title: str,
+    meta_entries: list[dict],
+    layout: dict,
+    match_entries: list[_MetaMatchEntry] | None = None,
 ) -> int | None:
     """
     Find the pdf_page for a title by scanning meta entries that are classified
-    as section/subsection.
+    as section/subsection.  When resolving many titles, build ``match_entries``
+    once with _build_meta_match_entries so each call is a few lookups and a short scan.
     """
-    norm = _normalize(title).lower()
-    norm_core = _strip_section_num(norm)
+    if match_entries is None:
+        match_entries = _build_meta_match_entries(meta_entries, layout)
+    norm, norm_core = _title_match_key(title)[:2]
+
+    # An exact match anywhere beats any fuzzy one, so check those first
+    if isinstance(match_entries, _MetaMatchEntries):
+        i = match_entries.exact_position(norm, norm_core)
+        if i is not None:
+            return match_entries[i][2]
+    else:
+        for mt, mt_core, page_id in match_entries:
+            if mt == norm:
+                return page_id
+            if norm_core and mt_core and (norm_core == mt_core):
+                return page_id
 
+    if len(norm_core) <= 5:
+        return None
+    # Fuzzy: containment either way, scored by length ratio; only a score above 0.8
+    # is used, which bounds the core lengths worth comparing.
+    if isinstance(match_entries, _MetaMatchEntries):
+        candidates = [match_entries[i] for i in match_entries.fuzzy_positions(len(norm_core))]
+    else:
+        candidates = [e for e in match_entries if len(e[1]) > 5]
     best_fuzzy_page = None
     best_fuzzy_score = 0.0
-
-    for e in meta_entries:
-        role = classify_meta_entry(e, layout)
-        if role in ("running_header", "margin", "unknown"):
-            continue
-        mt = _normalize(e.get("title") or "").lower()
-        mt_core = _strip_section_num(mt)
-
-        if mt == norm:
-            return e.get("page_id")
-        if norm_core and mt_core and (norm_core == mt_core):
-            return e.get("page_id")
-        if norm_core and mt_core and len(norm_core) > 5 and len(mt_core) > 5:
-            if norm_core in mt_core:
-                score = len(norm_core) / len(mt_core)
-                if score > best_fuzzy_score:
-                    best_fuzzy_score = score
-                    best_fuzzy_page = e.get("page_id")
-            elif mt_core in norm_core:
-                score = len(mt_core) / len(norm_core)
-                if score > best_fuzzy_score:
-                    best_fuzzy_score = score
-                    best_fuzzy_page = e.get("page_id")
+    for _mt, mt_core, page_id in candidates:
+        if norm_core in mt_core:
+            score = len(norm_core) / len(mt_core)
+            if score > best_fuzzy_score:
+                best_fuzzy_score = score
+                best_fuzzy_page = page_id
+        elif mt_core in norm_core:
+            score = len(mt_core) / len(norm_core)
+            if score > best_fuzzy_score:
+                best_fuzzy_score = score
+                best_fuzzy_page = page_id
 
     if best_fuzzy_page is not None and best_fuzzy_score > 0.8:
         return best_fuzzy_page
@@ -1563,35 +2187,41 @@ def _is_toc_page_numbers_corrupted(
     
     Returns: (is_corrupted, reason)
     """
-    candidates = []
+    counts: Counter[int] = Counter()  # offset → number of TOC rows agreeing
     for title, toc_page in toc_rows:
         if toc_page <= 0:
             continue
         pdf_page = _meta_pdf_page_for_fast(title, meta_lookup)
         if pdf_page:
-            candidates.append(pdf_page - toc_page)
+            counts[pdf_page - toc_page] += 1
+    n_samples = counts.total()
     
-    if len(candidates) < 5:
+    if n_samples < 5:
         return (False, "")  # Not enough data to judge
     
-    counts = Counter(candidates)
-    best_offset, best_count = counts.most_common(1)[0]
-    confidence = best_count / len(candidates)
+    # The mode, ties to the first offset seen (what most_common(1) returns, minus
+    # its heapq.nlargest wrapper and result list)
+    best_offset, best_count = max(counts.items(), key=itemgetter(1))
+    confidence = best_count / n_samples
     n_distinct = len(counts)
     
     # Check for corruption signals
     # 1. Too many distinct offsets relative to sample size
-    distinct_ratio = n_distinct / len(candidates)
+    distinct_ratio = n_distinct / n_samples
     if distinct_ratio > 0.3 and n_distinct > 10:
-        return (True, f"too many distinct offsets ({n_distinct} unique in {len(candidates)} samples, ratio={distinct_ratio:.2f})")
+        return (
+            True,
+            f"too many distinct offsets ({n_distinct} unique in {n_samples} samples, "
+            f"ratio={distinct_ratio:.2f})",
+        )
     
     # 2. Very low confidence AND many distinct values
     if confidence < 0.35 and n_distinct > 8:
         return (True, f"low confidence ({confidence:.0%}) with {n_distinct} distinct offsets")
     
     # 3. Check for wild variance (some offsets negative, some very large)
-    neg_count = sum(1 for o in candidates if o < 0)
-    large_count = sum(1 for o in candidates if o > 100)
+    neg_count = sum(c for o, c in counts.items() if o < 0)
+    large_count = sum(c for o, c in counts.items() if o > 100)
     if neg_count > 2 and large_count > 2:
         return (True, f"mixed negative ({neg_count}) and large ({large_count}) offsets")
     
@@ -1603,36 +2233,41 @@ def _compute_offset_with_confidence(
     meta_lookup: dict[str, int],
     page_markers: dict[int, int],
     lines: list[str],
+    head_index: list[_HeadEntry] | None = None,
+    page_cache: array | None = None,
 ) -> tuple[int | None, float, str]:
     """
     Find pdf_to_toc_offset using pre-built meta lookup, with heading fallback.
+    The heading fallback uses the caller's ``head_index``/``page_cache`` when given.
     
     Returns: (offset, confidence, source)
         - offset: the computed offset or None
         - confidence: 0.0-1.0 (proportion of matches agreeing on this offset)
         - source: "meta" | "headings" | "none"
     """
-    candidates = []
+    counts: Counter[int] = Counter()  # offset → number of TOC rows agreeing
     for title, toc_page in toc_rows:
         if toc_page <= 0:
             continue
         pdf_page = _meta_pdf_page_for_fast(title, meta_lookup)
         if pdf_page:
-            candidates.append(pdf_page - toc_page)
+            counts[pdf_page - toc_page] += 1
 
-    if candidates:
-        counts = Counter(candidates)
-        best_offset, best_count = counts.most_common(1)[0]
-        confidence = best_count / len(candidates)
+    if counts:
+        best_offset, best_count = max(counts.items(), key=itemgetter(1))  # mode, first on ties
+        n_samples = counts.total()
+        confidence = best_count / n_samples
         log.info("Offset %d from meta (confidence %.0f%%, %d/%d matches)",
-                 best_offset, confidence * 100, best_count, len(candidates))
+                 best_offset, confidence * 100, best_count, n_samples)
         return (best_offset, confidence, "meta")
 
     # Fallback: match TOC entries against body headings to derive offset
     if not page_markers:
         return (None, 0.0, "none")
-    head_index = _build_heading_index(lines)
-    page_cache = _build_page_cache(lines)
+    if head_index is None:
+        head_index = _build_heading_index(lines)
+    if page_cache is None:
+        page_cache = _build_page_cache(lines)
     for title, toc_page in toc_rows:
         if toc_page <= 0:
             continue
@@ -1642,13 +2277,13 @@ def _compute_offset_with_confidence(
         if found:
             pg_at = _page_at_line(lines, found, page_cache)
             if pg_at is not None and pg_at > 0:
-                candidates.append(pg_at - toc_page)
-    if candidates:
-        counts = Counter(candidates)
-        best_offset, best_count = counts.most_common(1)[0]
-        confidence = best_count / len(candidates)
+                counts[pg_at - toc_page] += 1
+    if counts:
+        best_offset, best_count = max(counts.items(), key=itemgetter(1))  # mode, first on ties
+        n_samples = counts.total()
+        confidence = best_count / n_samples
         log.info("Offset %d from heading matching (confidence %.0f%%, %d/%d matches)",
-                 best_offset, confidence * 100, best_count, len(candidates))
+                 best_offset, confidence * 100, best_count, n_samples)
         return (best_offset, confidence, "headings")
     return (None, 0.0, "none")
 
@@ -1677,8 +2312,11 @@ def _resolve_pdf_page(toc_page: int, offset: int | None) -> int | None:
 # Phase 5: Nesting
 # ---------------------------------------------------------------------------
 
-def _assign_depths_and_parents(nodes: list[dict]):
-    """Assign depth and nest nodes. Use existing depth (e.g. from MD heading level) when set."""
+def _assign_depths_and_parents(nodes: list[dict], fallback_end: int):
+    """
+    Assign depth and nest nodes. Use existing depth (e.g. from MD heading level) when set.
+    The last node ends at fallback_end (the line count of the document).
+    """
     for node in nodes:
         if "depth" not in node:
             node["depth"] = _depth(node["title"])
@@ -1689,13 +2327,13 @@ def _assign_depths_and_parents(nodes: list[dict]):
     
     # Last node ends at fallback
     if nodes:
-        nodes[-1]["md_end_line"] = nodes[-1]["_fallback_end"]
+        nodes[-1]["md_end_line"] = fallback_end
 
 
-def _fix_md_end_lines_by_document_order(nodes: list[dict]) -> None:
+def _fix_md_end_lines_by_document_order(nodes: list[dict], fallback_end: int) -> None:
     """
-    Reassign md_end_line so each section ends at the next heading in document order.
-    Uses bisect for O(N log N) instead of O(N²).
+    Reassign md_end_line so each section ends at the next heading in document order;
+    the last one ends at fallback_end. Uses bisect for O(N log N) instead of O(N²).
     """
     if not nodes:
         return
@@ -1706,12 +2344,18 @@ def _fix_md_end_lines_by_document_order(nodes: list[dict]) -> None:
         if idx < len(starts_asc):
             node["md_end_line"] = starts_asc[idx]
         else:
-            node["md_end_line"] = node.get("_fallback_end", start)
+            node["md_end_line"] = fallback_end
 
 def _build_tree(nodes: list[dict]) -> list[dict]:
-    """Convert list of nodes into nested tree based on depth."""
+    """Convert list of nodes into nested tree based on depth.
+
+    The stack holds the open ancestors (strictly increasing depth); each node is
+    pushed and popped at most once.  A fixed "last node at each depth" table was
+    tried instead and measured ~1.6x slower: it has to search down for the parent
+    and clear the deeper slots on every node.
+    """
     root_nodes = []
-    stack = []  # (node, depth)
+    stack = []  # open ancestors, shallowest first
 
     for node in nodes:
         depth = node["depth"]
@@ -1731,18 +2375,49 @@ def _build_tree(nodes: list[dict]) -> list[dict]:
     return root_nodes
 
 
+def _walk_preorder(roots: list[dict]) -> list[dict]:
+    """Every node of the tree, parent before children, siblings in order (no recursion)."""
+    out = []
+    stack = roots[::-1]
+    while stack:
+        node = stack.pop()
+        out.append(node)
+        kids = node.get("children")
+        if kids:
+            stack.extend(reversed(kids))
+    return out
+
+
+def _walk_postorder(roots: list[dict]) -> list[dict]:
+    """Every node of the tree, children before parent, siblings in order (no recursion).
+
+    Built as the reverse of a preorder walk that visits siblings last-to-first.
+    """
+    out = []
+    stack = list(roots)
+    while stack:
+        node = stack.pop()
+        out.append(node)
+        kids = node.get("children")
+        if kids:
+            stack.extend(kids)
+    out.reverse()
+    return out
+
+
 def _recompute_pdf_page_ends_in_tree(
     nodes: list[dict],
     lines: list[str],
     page_markers: dict[int, int],
-    page_cache: list[int] | None = None,
+    page_cache: array | None = None,
 ) -> None:
-    """Recompute pdf_page_end for every node from its md_end_line (after tree fixes)."""
-    for node in nodes:
+    """Recompute pdf_page_end for every leaf from its md_end_line (after tree fixes),
+    then give parents their last child's end as _propagate_parent_ends does — one
+    post-order walk for both."""
+    for node in _walk_postorder(nodes):
         if node.get("children"):
-            _recompute_pdf_page_ends_in_tree(
-                node["children"], lines, page_markers, page_cache=page_cache
-            )
+            _propagate_to_parent(node)
+            continue
         end_page = _page_at_line(lines, node.get("md_end_line", 0), page_cache)
         if end_page <= 0 and node.get("pdf_page"):
             end_page = node["pdf_page"]
@@ -1751,25 +2426,42 @@ def _recompute_pdf_page_ends_in_tree(
 
 def _propagate_parent_ends(nodes: list[dict]) -> None:
     """Set each parent's md_end_line and pdf_page_end to the last descendant's end (by document order). End page never less than start."""
-    for node in nodes:
+    for node in _walk_postorder(nodes):
         if node.get("children"):
-            _propagate_parent_ends(node["children"])
-            last = max(node["children"], key=lambda c: c.get("md_end_line", 0))
-            node["md_end_line"] = last["md_end_line"]
-            child_end = last.get("pdf_page_end") or 0
-            start_page = node.get("pdf_page") or 0
-            node["pdf_page_end"] = max(child_end, start_page) if child_end or start_page else None
+            _propagate_to_parent(node)
+
+
+def _propagate_to_parent(node: dict) -> None:
+    """Copy the last child's md_end_line/pdf_page_end onto ``node`` (children already final)."""
+    children = node["children"]
+    # First child with the greatest end line.  Not simply children[-1]:
+    # after tree repairs ends need not follow child order.
+    last = children[0]
+    if len(children) > 1:
+        ends = [c.get("md_end_line", 0) for c in children]
+        last = children[ends.index(max(ends))]
+    node["md_end_line"] = last["md_end_line"]
+    child_end = last.get("pdf_page_end") or 0
+    start_page = node.get("pdf_page") or 0
+    node["pdf_page_end"] = max(child_end, start_page) if child_end or start_page else None
 
 
 def _flatten_sections_for_check(sections: list[dict]) -> list[dict]:
     """Flatten section tree to list of {md_start_line, md_end_line} for sanity check."""
-    out = []
-    for node in sections:
-        if "md_start_line" in node and "md_end_line" in node:
-            out.append({"md_start_line": node["md_start_line"], "md_end_line": node["md_end_line"]})
-        if node.get("children"):
-            out.extend(_flatten_sections_for_check(node["children"]))
-    return out
+    return [
+        {"md_start_line": node["md_start_line"], "md_end_line": node["md_end_line"]}
+        for node in _walk_preorder(sections)
+        if "md_start_line" in node and "md_end_line" in node
+    ]
+
+
+def _has_inverted_range(sections: list[dict]) -> bool:
+    """True if any node in the tree has md_start_line > md_end_line (stops at the first)."""
+    return any(
+        node["md_start_line"] > node["md_end_line"]
+        for node in _walk_preorder(sections)
+        if "md_start_line" in node and "md_end_line" in node
+    )
 
 
 def _detect_and_repair_inversions(chapters: list[dict], diag: list[str]) -> None:
@@ -1794,10 +2486,6 @@ def _detect_and_repair_inversions(chapters: list[dict], diag: list[str]) -> None
         if not children:
             return
         
-        # Recursively repair children first
-        for child in children:
-            repair_node(child)
-        
         # Check for inversion: parent should come before first child
         parent_line = node.get("md_start_line", 0)
         parent_page = node.get("pdf_page") or 0
@@ -1837,15 +2525,19 @@ def _detect_and_repair_inversions(chapters: list[dict], diag: list[str]) -> None
                 reason, title, old_line, old_page, child_line, child_page
             )
     
-    for chapter in chapters:
-        repair_node(chapter)
+    # Children are repaired before their parent reads them
+    for node in _walk_postorder(chapters):
+        repair_node(node)
+
+
+_MAJOR_SECTION_RE = re.compile(r"(?i)^(chapter|part|appendix)\b")
 
 
 def _expand_collapsed_parent_md_starts(
     chapters: list[dict],
     lines: list[str],
     page_markers: dict[int, int],
-    page_cache: list[int],
+    page_cache: array,
     diag: list[str],
 ) -> None:
     """
@@ -1865,11 +2557,9 @@ def _expand_collapsed_parent_md_starts(
         if depth == 1:
             return True
         t = (title or "").strip()
-        return bool(re.match(r"(?i)^(chapter|part|appendix)\b", t))
+        return bool(_MAJOR_SECTION_RE.match(t))
 
     def visit(node: dict) -> None:
-        for c in node.get("children") or []:
-            visit(c)
         kids = node.get("children")
         if not kids:
             return
@@ -1916,59 +2606,55 @@ def _expand_collapsed_parent_md_starts(
             ml,
         )
 
-    for ch in chapters:
-        visit(ch)
+    for node in _walk_postorder(chapters):
+        visit(node)
 
 
 def _all_starts_from_tree(nodes: list[dict]) -> list[int]:
     """Collect all md_start_line from tree (for document-order fix)."""
-    out = []
-    for node in nodes:
-        if "md_start_line" in node:
-            out.append(node["md_start_line"])
-        if node.get("children"):
-            out.extend(_all_starts_from_tree(node["children"]))
-    return out
+    return [node["md_start_line"] for node in _walk_preorder(nodes) if "md_start_line" in node]
 
 
 def _fix_inverted_in_tree(root_nodes: list[dict], fallback_end: int) -> None:
     """Ensure no node has md_end_line < md_start_line; fix by next start in document order, then re-propagate."""
     starts_asc = sorted(set(_all_starts_from_tree(root_nodes)))
 
-    def fix_node(node: dict) -> None:
-        if "md_start_line" not in node or "md_end_line" not in node:
-            return
-        start = node["md_start_line"]
-        end = node["md_end_line"]
-        if end < start or end <= 0:
-            idx = bisect.bisect_right(starts_asc, start)
-            node["md_end_line"] = starts_asc[idx] if idx < len(starts_asc) else fallback_end
-        for c in node.get("children", []):
-            fix_node(c)
-
-    for node in root_nodes:
-        fix_node(node)
+    def fix_all() -> None:
+        # A node without a line range is skipped together with its subtree.
+        stack = root_nodes[::-1]
+        while stack:
+            node = stack.pop()
+            if "md_start_line" not in node or "md_end_line" not in node:
+                continue
+            start = node["md_start_line"]
+            end = node["md_end_line"]
+            if end < start or end <= 0:
+                idx = bisect.bisect_right(starts_asc, start)
+                node["md_end_line"] = starts_asc[idx] if idx < len(starts_asc) else fallback_end
+            stack.extend(reversed(node.get("children", [])))
+
+    fix_all()
     _propagate_parent_ends(root_nodes)
-    for node in root_nodes:
-        fix_node(node)
+    fix_all()
 
 
 # ---------------------------------------------------------------------------
 # LLM TOC fallback (when rules produce broken or too many roots)
 # ---------------------------------------------------------------------------
 
-def _collect_headers_for_llm(lines: list[str]) -> str:
+def _collect_headers_for_llm(lines: list[str], heading_lines: list[int] | None = None) -> str:
     """
     Build a compact text blob of all markdown headings for LLM TOC inference.
     Format: "line_number: #level raw_heading_text" (one per line).
     """
     out = []
-    for i, line in enumerate(lines, start=1):
-        if not HEADING_RE.match(line):
+    heading_match = HEADING_RE.match
+    candidates = range(1, len(lines) + 1) if heading_lines is None else heading_lines
+    for i in candidates:
+        line = lines[i - 1]
+        if line[:1] != "#" or not heading_match(line):
             continue
-        level = 0
-        while level < len(line) and line[level] == "#":
-            level += 1
+        level = len(line) - len(line.lstrip("#"))
         if level > 6:
             continue
         raw = line[level:].strip()
@@ -2031,13 +2717,22 @@ def _enrich_toc_depths_with_llm(
         prompt = "Assign depth (1=Part/division, 2=Chapter/section, 3=Subsection) to each entry. Preserve order.\n\n" + "\n".join(numbered)
         log.info("index: calling LLM to enrich TOC with depths (tool=toc)")
     try:
-        response = complete(
-            prompt,
-            system=TOC_ENRICH_SYSTEM,
-            temperature=0.0,
-            max_tokens=8192,
-            client=get_client(tool="toc"),
+        client = get_client(tool="toc")
+        cache_key = _llm_cache_key(
+            TOC_ENRICH_SYSTEM, prompt, 8192, getattr(client, "default_model", ""),
         )
+        cached = _llm_cache_get(cache_key)
+        if cached is not None:
+            log.info("index: TOC depth enrichment answered from cache")
+            response = cached
+        else:
+            response = complete(
+                prompt,
+                system=TOC_ENRICH_SYSTEM,
+                temperature=0.0,
+                max_tokens=8192,
+                client=client,
+            )
     except Exception as e:
         log.warning("LLM TOC depth enrichment failed: %s", e)
         return None
@@ -2050,13 +2745,15 @@ def _enrich_toc_depths_with_llm(
         if start >= 0 and end > start:
             text = text[start:end]
     try:
-        data = json.loads(text)
+        data = _json_loads(text)
     except json.JSONDecodeError as e:
         log.warning("LLM TOC enrich response not valid JSON: %s", e)
         return None
     if not isinstance(data, list) or len(data) != len(toc_rows):
         log.warning("LLM TOC enrich: expected %d entries, got %d", len(toc_rows), len(data) if isinstance(data, list) else 0)
         return None
+    if cached is None:
+        _llm_cache_put(cache_key, response)
     enriched = []
     for i, item in enumerate(data):
         if not isinstance(item, dict):
@@ -2087,13 +2784,22 @@ def _infer_toc_with_llm(headers_text: str) -> list[dict] | None:
     log.info("index: calling LLM for TOC inference (tool=toc)")
     prompt = TOC_INFER_USER_PREFIX + headers_text
     try:
-        response = complete(
-            prompt,
-            system=TOC_INFER_SYSTEM,
-            temperature=0.0,
-            max_tokens=8192,
-            client=get_client(tool="toc"),
+        client = get_client(tool="toc")
+        cache_key = _llm_cache_key(
+            TOC_INFER_SYSTEM, prompt, 8192, getattr(client, "default_model", ""),
         )
+        cached = _llm_cache_get(cache_key)
+        if cached is not None:
+            log.info("index: TOC inference answered from cache")
+            response = cached
+        else:
+            response = complete(
+                prompt,
+                system=TOC_INFER_SYSTEM,
+                temperature=0.0,
+                max_tokens=8192,
+                client=client,
+            )
     except Exception as e:
         log.warning("LLM TOC inference failed: %s", e)
         return None
@@ -2107,7 +2813,7 @@ def _infer_toc_with_llm(headers_text: str) -> list[dict] | None:
         if start >= 0 and end > start:
             text = text[start:end]
     try:
-        data = json.loads(text)
+        data = _json_loads(text)
     except json.JSONDecodeError as e:
         log.warning("LLM TOC response not valid JSON: %s", e)
         return None
@@ -2134,6 +2840,8 @@ def _infer_toc_with_llm(headers_text: str) -> list[dict] | None:
             except (TypeError, ValueError):
                 page = None
         entries.append({"title": title.strip(), "depth": depth, "page": page})
+    if entries and cached is None:
+        _llm_cache_put(cache_key, response)
     return entries if entries else None
 
 
@@ -2141,13 +2849,18 @@ def _build_nodes_from_llm_toc(
     llm_entries: list[dict],
     lines: list[str],
     page_markers: dict[int, int],
+    head_index: _HeadIndex | None = None,
+    page_cache: array | None = None,
+    marker_lines: list[int] | None = None,
 ) -> list[dict]:
     """
     Convert LLM-inferred TOC (titles only) into index nodes. We use LLM only for
     structure; pdf_page, pdf_page_end, and depth are always derived from the book.
+    build_index passes the heading index and page cache it already built for
+    heading resolution, so this fallback adds no further passes over ``lines``.
     """
-    pc = _build_page_cache(lines)
-    hi = _build_heading_index(lines)
+    pc = page_cache if page_cache is not None else _build_page_cache(lines, marker_lines)
+    hi = head_index if head_index is not None else _build_heading_index(lines)
     resolved = []
     for entry in llm_entries:
         title = entry["title"]
@@ -2163,7 +2876,8 @@ def _build_nodes_from_llm_toc(
                 pass
         md_depth = _heading_level_at_line(lines, md_start)
         depth = md_depth if md_depth is not None else entry.get("depth", 1)
-        depth = max(1, min(6, depth))
+        if not 1 <= depth <= 6:  # clamp; in range almost always
+            depth = max(1, min(6, depth))
         resolved.append({
             "title": title,
             "depth": depth,
@@ -2172,7 +2886,7 @@ def _build_nodes_from_llm_toc(
         })
     if not resolved:
         return []
-    resolved.sort(key=lambda x: x["md_start_line"])
+    resolved.sort(key=itemgetter("md_start_line"))
     nodes = []
     for idx, r in enumerate(resolved):
         node = {
@@ -2181,19 +2895,10 @@ def _build_nodes_from_llm_toc(
             "depth": r["depth"],
             "pdf_page": r["pdf_page"],
             "md_start_line": r["md_start_line"],
-            "_fallback_end": len(lines),
         }
         nodes.append(node)
-    _assign_depths_and_parents(nodes)
-    for i, node in enumerate(nodes):
-        end_page = _page_at_line(lines, node["md_end_line"], pc)
-        if end_page == 0 and i + 1 < len(nodes):
-            next_start = nodes[i + 1].get("pdf_page")
-            if next_start and next_start > 0:
-                end_page = next_start - 1
-        if end_page == 0 and node.get("pdf_page"):
-            end_page = node["pdf_page"]
-        node["pdf_page_end"] = end_page
+    _assign_depths_and_parents(nodes, len(lines))
+    _assign_flat_page_ends(nodes, lines, pc)
     return nodes
 
 
@@ -2203,29 +2908,41 @@ def _build_nodes_from_llm_toc(
 
 def build_index(md_path: Path, meta_path: Path | None = None) -> dict:
     log.info("Building index from %s", md_path.name)
+    # readlines, not read().splitlines(): it is as fast in CPython, and splitlines also
+    # breaks on \f, \x1c-\x1e, \u2028 etc., which would shift line numbers against the
+    # readers (core.py) that slice the same file by md_start_line/md_end_line.
+    # read().split("\n") (text or bytes + decode) measured ~15% slower, and its trailing
+    # "" element would change len(lines), the last section's md_end_line.
     with open(md_path, 'r', encoding='utf-8') as f:
         lines = f.readlines()
 
     meta_entries = []
     if meta_path and meta_path.is_file():
         try:
+            # One read + orjson parse when available (meta files can be large)
             with open(meta_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                meta_entries = data.get("table_of_contents", [])
+                data = _json_loads(f.read())
+            meta_entries = data.get("table_of_contents", [])
         except Exception as e:
             log.warning(f"Failed to load meta: {e}")
             
     layout = build_layout_model(meta_entries)
+    # Roles are classified once here and shared by the meta scan and the annotations
+    meta_roles = _classify_meta_entries(meta_entries, layout)
+    # Page lookup and meta TOC rows come from one pass over the meta entries
+    meta_lookup, meta_parsed = _scan_meta_entries(meta_entries, layout, meta_roles)
     
     # 1. TOC source: prefer raw markdown → LLM (single source of truth). Else meta or parsed table.
     llm_toc_entries: list[dict] | None = None  # list of {title, depth, page} from LLM
     toc_rows: list[tuple[str, int]] = []  # (title, page) for offset / fallback
     toc_from_meta = False
 
-    raw_toc_md = _get_raw_toc_markdown(lines)
+    # Contents bounds are shared by the raw-TOC, table-parse and heading-fallback paths.
+    toc_bounds = _contents_section_bounds(lines)
+    raw_toc_md = _get_raw_toc_markdown(lines, bounds=toc_bounds)
     if raw_toc_md:
         # Parse table mechanically first (titles + pages); LLM only assigns depths
-        pre_parsed = parse_contents_table(lines)
+        pre_parsed = parse_contents_table(lines, bounds=toc_bounds)
         # Filter self-referencing "Contents" entries from the TOC
         pre_parsed = [(t, p) for t, p in pre_parsed if t.strip().lower() != "contents"]
         if pre_parsed:
@@ -2245,23 +2962,6 @@ def build_index(md_path: Path, meta_path: Path | None = None) -> dict:
             )
 
     if not toc_rows and meta_entries:
-        seen = set()
-        meta_parsed: list[tuple[str, int]] = []
-        for e in meta_entries:
-            raw_title = (e.get("title") or "").strip().replace("\n", " ")
-            if not raw_title or len(raw_title) < 2:
-                continue
-            title = _normalize(raw_title)
-            if not title:
-                continue
-            page_id = e.get("page_id")
-            if page_id is None:
-                continue
-            key = (title, page_id)
-            if key in seen:
-                continue
-            seen.add(key)
-            meta_parsed.append((title, page_id))
         if meta_parsed:
             log.info("No Contents section; using %d meta TOC entries. Assigning hierarchy depths...", len(meta_parsed))
             llm_toc_entries = _enrich_toc_from_raw_markdown_llm("", parsed_rows=meta_parsed)
@@ -2275,8 +2975,12 @@ def build_index(md_path: Path, meta_path: Path | None = None) -> dict:
         pass
 
     # 2. Page markers + caches (all O(lines) one-time)
-    page_markers = _build_page_marker_index(lines)
-    meta_lookup = _build_meta_page_lookup(meta_entries, layout)
+    heading_lines, marker_lines = _scan_line_kinds(lines)
+    page_markers = _build_page_marker_index(lines, marker_lines)
+    # line → pdf page for every line; all _page_at_line lookups below index into it.
+    # Built even without markers (all zeros) so the headings/LLM fallbacks reuse it
+    # instead of each building their own.
+    page_cache = _build_page_cache(lines, marker_lines)
 
     # 2b. Check if TOC page numbers are corrupted (e.g., malformed markdown table from Marker)
     # If corrupted, fall back to building index purely from headings
@@ -2286,9 +2990,11 @@ def build_index(md_path: Path, meta_path: Path | None = None) -> dict:
         if toc_corrupted:
             log.warning("TOC page numbers appear corrupted: %s", corruption_reason)
             log.info("Falling back to headings-based index")
-            nodes = build_index_from_headings(lines)
+            nodes = build_index_from_headings(
+                lines, toc_bounds, heading_lines, marker_lines, page_cache,
+            )
             chapters = _build_tree(nodes)
-            _fix_md_end_lines_by_document_order(nodes)
+            _fix_md_end_lines_by_document_order(nodes, len(lines))
             page_count = max(page_markers.keys()) if page_markers else None
             return {
                 "index_version": INDEX_VERSION,
@@ -2307,13 +3013,15 @@ def build_index(md_path: Path, meta_path: Path | None = None) -> dict:
     # 3. Offset (for narrowing heading search window; final pdf_page is always
     #    derived from the matched line, never from the TOC page).
     # Also compute confidence to validate matches later.
+    head_index = _build_heading_index(lines, heading_lines)
     if toc_from_meta:
         offset = 0
         offset_confidence = 1.0
         offset_source = "meta_toc"
     else:
         offset, offset_confidence, offset_source = _compute_offset_with_confidence(
-            toc_rows, meta_lookup, page_markers, lines
+            toc_rows, meta_lookup, page_markers, lines,
+            head_index=head_index, page_cache=page_cache,
         )
     
     # Validation threshold: reject matches more than this many pages from expected
@@ -2342,21 +3050,32 @@ def build_index(md_path: Path, meta_path: Path | None = None) -> dict:
 
     n_entries = len(entries_with_depth)
     log.info("Resolving %d section headings in document order...", n_entries)
-    head_index = _build_heading_index(lines)
-    page_cache = _build_page_cache(lines) if page_markers else None
     search_after_line = 0
+    # Merge pointer into head_index: TOC rows arrive in document order, so each
+    # _locate_heading only bisects forward from here instead of over all headings.
+    # Do not reorder the rows (e.g. by page): the search is forward-only from the
+    # previous match, so the order decides which of two same-titled headings a row
+    # gets, and TOC page numbers are not reliably monotonic.
     head_start_index = 0
-    progress_interval = max(1, n_entries // 10)
+    # Progress roughly every tenth of the entries, rounded down to a power of two so
+    # the per-row check is a mask test
+    progress_mask = (1 << max(0, (n_entries // 10).bit_length() - 1)) - 1
     has_llm_pages = llm_toc_entries is not None
-    for toc_index, (title, toc_page, depth_from_llm) in enumerate(entries_with_depth):
-        if toc_index > 0 and toc_index % progress_interval == 0:
+    # Page hint narrows the search window; never stored as the final page.  It depends
+    # only on the entry, so it is worked out for the whole TOC up front, with the
+    # meta lookup only for non-LLM TOCs.
+    if has_llm_pages:
+        page_hints = [_resolve_pdf_page(toc_page, offset) for _, toc_page, _ in entries_with_depth]
+    else:
+        page_hints = []
+        for title, toc_page, _ in entries_with_depth:
+            hint = _meta_pdf_page_for_fast(title, meta_lookup)
+            page_hints.append(hint if hint is not None else _resolve_pdf_page(toc_page, offset))
+    for toc_index, ((title, toc_page, depth_from_llm), pdf_page_hint) in enumerate(
+        zip(entries_with_depth, page_hints)
+    ):
+        if toc_index and not toc_index & progress_mask:
             log.info("  resolved %d / %d...", toc_index, n_entries)
-        # Page hint narrows the search window; never stored as the final page.
-        pdf_page_hint = None
-        if not has_llm_pages:
-            pdf_page_hint = _meta_pdf_page_for_fast(title, meta_lookup)
-        if pdf_page_hint is None:
-            pdf_page_hint = _resolve_pdf_page(toc_page, offset)
 
         # If expected page is before last resolved page, allow searching earlier
         # (handles case where previous entry was wrongly matched late in document)
@@ -2371,6 +3090,7 @@ def build_index(md_path: Path, meta_path: Path | None = None) -> dict:
         md_start, head_start_index = _locate_heading(
             lines, title, pdf_page_hint, page_markers, search_from,
             head_index=head_index, head_start_index=head_start_index,
+            page_cache=page_cache,
         )
         if md_start is None and pdf_page_hint is not None and pdf_page_hint in page_markers:
             marker_line = page_markers[pdf_page_hint]
@@ -2443,14 +3163,13 @@ def build_index(md_path: Path, meta_path: Path | None = None) -> dict:
                 depth = depth_from_llm
                 if depth is None:
                     depth = _heading_level_at_line(lines, md_start)
-                if depth is not None:
+                if depth is not None and not 1 <= depth <= 6:  # clamp; in range almost always
                     depth = max(1, min(6, depth))
                 node = {
                     "id": _slug(title, len(nodes)),
                     "title": title,
                     "pdf_page": pdf_page,
                     "md_start_line": md_start,
-                    "_fallback_end": len(lines),
                 }
                 if depth is not None:
                     node["depth"] = depth
@@ -2460,41 +3179,14 @@ def build_index(md_path: Path, meta_path: Path | None = None) -> dict:
             diag.append(f"UNRESOLVED: {title}")
             
     # 5. Nesting
-    _assign_depths_and_parents(nodes)
+    _assign_depths_and_parents(nodes, len(lines))
     # Fix inverted ranges: set each node's end to next heading in document order (TOC order can differ)
-    _fix_md_end_lines_by_document_order(nodes)
+    _fix_md_end_lines_by_document_order(nodes, len(lines))
     
-    # pdf_page_end: O(N) reverse pass to find next same-or-shallower node's start page
-    if page_markers:
-        n_nodes = len(nodes)
-        # Reverse pass: for each node find the next node at same-or-shallower depth
-        next_same_level_page: list[int] = [0] * n_nodes
-        # Stack of (depth, pdf_page) — entries at depths we haven't closed yet
-        depth_stack: list[tuple[int, int]] = []
-        for i in range(n_nodes - 1, -1, -1):
-            node_depth = nodes[i].get("depth", 99)
-            # Pop entries deeper than us (they're nested under us, not peers)
-            while depth_stack and depth_stack[-1][0] > node_depth:
-                depth_stack.pop()
-            # Top of stack is next same-or-shallower node (or empty = no cap)
-            if depth_stack:
-                next_same_level_page[i] = depth_stack[-1][1]
-            depth_stack.append((node_depth, nodes[i].get("pdf_page") or 0))
-        for i, node in enumerate(nodes):
-            end_page = _page_at_line(lines, node["md_end_line"], page_cache)
-            if end_page == 0 and i + 1 < n_nodes:
-                next_start = nodes[i + 1].get("pdf_page")
-                if next_start and next_start > 0:
-                    end_page = next_start - 1
-            if end_page == 0 and node.get("pdf_page"):
-                end_page = node["pdf_page"]
-            ns = next_same_level_page[i]
-            if ns > 0 and (end_page <= 0 or end_page >= ns):
-                end_page = ns - 1
-            node["pdf_page_end"] = max(end_page or 0, node.get("pdf_page") or 0)
-    else:
-        for node in nodes:
-            node["pdf_page_end"] = None
+    # pdf_page_end is computed on the tree once md lines are final (below); the
+    # placeholder only keeps the key in its usual place in each node.
+    for node in nodes:
+        node["pdf_page_end"] = None
 
     chapters = _build_tree(nodes)
     _fix_inverted_in_tree(chapters, len(lines))
@@ -2507,17 +3199,19 @@ def build_index(md_path: Path, meta_path: Path | None = None) -> dict:
             chapters, lines, page_markers, page_cache, diag
         )
 
-    # Recompute pdf_page_end from current md_end_line after tree fixes, then propagate (keeps higher-level pages robust)
+    # pdf_page_end from current md_end_line after tree fixes, propagated to parents
+    # (keeps higher-level pages robust)
     if page_markers:
         _recompute_pdf_page_ends_in_tree(chapters, lines, page_markers, page_cache=page_cache)
-        _propagate_parent_ends(chapters)
 
     # 6. Fallback: only when we have no usable TOC (few_or_no_toc) do we try LLM as TOC replacement.
     # When we have a TOC but it's messy (inverted, many_roots), use header-based index; don't call LLM.
-    flat = _flatten_sections_for_check(chapters)
-    inverted = any(s["md_start_line"] > s["md_end_line"] for s in flat)
+    # The choice needs the repaired TOC tree above, so that tree is always built; a
+    # fallback builds its own node list, and each list goes through _build_tree once.
     many_roots = len(chapters) > 80
     few_or_no_toc = len(nodes) < 5
+    # Only the messy-TOC branch looks at inversions; the few_or_no_toc branch doesn't
+    inverted = not few_or_no_toc and _has_inverted_range(chapters)
     if few_or_no_toc:
         # No reliable TOC: use LLM to get section titles (structure only), then fill from book
         diag.append("FALLBACK: no or very few TOC entries; trying LLM as TOC replacement")
@@ -2525,23 +3219,30 @@ def build_index(md_path: Path, meta_path: Path | None = None) -> dict:
             "index fallback: few_or_no_toc (nodes=%d); trying LLM for TOC structure",
             len(nodes),
         )
-        headers_text = _collect_headers_for_llm(lines)
+        headers_text = _collect_headers_for_llm(lines, heading_lines)
         llm_entries = _infer_toc_with_llm(headers_text) if headers_text else None
         if llm_entries and len(llm_entries) >= 5:
             log.info("index: using LLM as TOC (%d titles), filling pages/depth from book", len(llm_entries))
             diag.append(f"LLM TOC replacement: {len(llm_entries)} entries (pages/depth from book)")
-            llm_nodes = _build_nodes_from_llm_toc(llm_entries, lines, page_markers)
+            llm_nodes = _build_nodes_from_llm_toc(
+                llm_entries, lines, page_markers,
+                head_index=head_index, page_cache=page_cache, marker_lines=marker_lines,
+            )
             if llm_nodes:
                 chapters = _build_tree(llm_nodes)
             else:
                 log.info("index: LLM TOC produced no nodes; using header-based index")
                 diag.append("LLM TOC produced no nodes; header-based index")
-                header_nodes = build_index_from_headings(lines)
+                header_nodes = build_index_from_headings(
+                    lines, toc_bounds, heading_lines, marker_lines, page_cache,
+                )
                 chapters = _build_tree(header_nodes)
         else:
             log.info("index: using header-based index (no LLM or LLM returned <%d entries)", 5)
             diag.append("Header-based index (no LLM or LLM returned too few)")
-            header_nodes = build_index_from_headings(lines)
+            header_nodes = build_index_from_headings(
+                lines, toc_bounds, heading_lines, marker_lines, page_cache,
+            )
             chapters = _build_tree(header_nodes)
     elif inverted or many_roots:
         # When we have LLM-enriched TOC depths, keep the TOC tree so the index only has TOC entries (no body-only headings like "Chapter 1")
@@ -2558,7 +3259,9 @@ def build_index(md_path: Path, meta_path: Path | None = None) -> dict:
                 inverted, many_roots,
             )
             diag.append("FALLBACK: TOC/meta had bad ranges or too many roots; header-based index")
-            header_nodes = build_index_from_headings(lines)
+            header_nodes = build_index_from_headings(
+                lines, toc_bounds, heading_lines, marker_lines, page_cache,
+            )
             chapters = _build_tree(header_nodes)
     else:
         log.info(
@@ -2566,7 +3269,7 @@ def build_index(md_path: Path, meta_path: Path | None = None) -> dict:
             len(nodes), len(chapters),
         )
 
-    annotations = _collect_annotations(meta_entries, layout)
+    annotations = _collect_annotations(meta_entries, layout, meta_roles)
 
     # Phase 5: Post-build verification
     flat_sections = _flatten_sections_for_check(chapters)
@@ -2632,9 +3335,60 @@ def build_index(md_path: Path, meta_path: Path | None = None) -> dict:
     }
 
 
+def _build_index_pair(pair: tuple[Path, Path | None]) -> dict:
+    """build_index for one (md_path, meta_path) pair; module-level so it pickles."""
+    md_path, meta_path = pair
+    return build_index(md_path, meta_path)
+
+
+def build_indexes_parallel(
+    pairs: list[tuple[Path, Path | None]], max_workers: int | None = None
+) -> list[dict]:
+    """Build indexes for several books, one worker process per book.
+
+    ``pairs`` are (md_path, meta_path or None); results come back in the same order.
+    Books share no state, so CPU-bound parsing/matching scales across cores (each
+    process still runs its own LLM chunk calls on threads).  The first failure, e.g.
+    TOCEnrichmentRequiredError, is raised once its book is reached.
+
+    Caches and threads: each worker process starts with its own module-level caches,
+    so nothing is shared between books. Within a process, the lru_cache helpers here
+    (normalization, title keys) are safe to use from several threads, and the on-disk
+    LLM answer cache that the chunk thread pool writes uses a temp file per process and
+    thread plus an atomic rename. The plain dict caches _BOOK_PATH_CACHE
+    (book_agent.path_utils) and _SECTIONS_CACHE (book_agent.core) are mutated without a
+    lock and assume a single-threaded caller.
+    """
+    if len(pairs) <= 1 or max_workers == 1:
+        return [_build_index_pair(p) for p in pairs]
+    # Imported here: it pulls in multiprocessing, about a quarter of this module's
+    # import time, and only batch builds need it.
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=max_workers) as ex:
+        return list(ex.map(_build_index_pair, pairs))
+
+
+def _json_dumps_indented(obj) -> bytes:
+    """UTF-8 JSON with 2-space indent, via orjson when installed (stdlib json for
+    anything orjson refuses, e.g. non-str keys or ints over 64 bits)."""
+    if _orjson is not None:
+        try:
+            return _orjson.dumps(obj, option=_orjson.OPT_INDENT_2)
+        except TypeError:
+            pass
+    return json.dumps(obj, indent=2).encode("utf-8")
+
+
 def write_index(index: dict, out_path: Path) -> None:
-    """Write index to JSON. Ensures index_version is set to current INDEX_VERSION."""
-    index = dict(index)
+    """Write index to JSON. Ensures index_version is set to current INDEX_VERSION.
+    Top-level keys starting with "_" are in-memory only and are not written.
+
+    Serialized in memory and written in one call; json.dump would issue a write
+    per token.
+    """
+    index = {k: v for k, v in index.items() if not k.startswith("_")}
     index["index_version"] = INDEX_VERSION
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(index, f, indent=2)
+    data = _json_dumps_indented(index)
+    with open(out_path, "wb") as f:
+        f.write(data)
@@ -1,13 +1,8 @@
 """Resolve book path to index and markdown file. No CLI (typer) dependency."""
 
+import os
 from pathlib import Path
 
-from book_agent.markdown_index import (
-    TOCEnrichmentRequiredError,
-    build_index,
-    write_index,
-)
-
 
 def resolve_folder_and_md(path: Path) -> tuple[Path, Path]:
     """
@@ -26,11 +21,36 @@ def resolve_folder_and_md(path: Path) -> tuple[Path, Path]:
     raise ValueError(f"Not a folder or .md file: {path}")
 
 
+# abspath of the argument → (index_path, md_path, book folder mtime_ns) from the last
+# resolve.  Tools resolve the same book on every call; a hit costs one stat instead of
+# resolve() + glob + a stat per .md file.  Not locked: assumes a single-threaded caller.
+_BOOK_PATH_CACHE: dict[str, tuple[Path, Path, int]] = {}
+
+
+def _folder_mtime_ns(folder: Path) -> int | None:
+    try:
+        return folder.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
 def resolve_book_path(path: Path) -> tuple[Path, Path]:
     """
     Resolve a path (folder, index.json, or .md file) to (index_path, md_path).
     Raises ValueError with a message if index or .md is not found.
+
+    Results are cached per path and reused while the book folder's mtime is unchanged
+    (adding, removing or renaming files updates it); resolve_book_path.cache_clear()
+    drops the cache.
     """
+    key = os.path.abspath(path)
+    hit = _BOOK_PATH_CACHE.get(key)
+    if hit is not None:
+        index_path, md_path, mtime_ns = hit
+        if _folder_mtime_ns(index_path.parent) == mtime_ns:
+            return index_path, md_path
+        del _BOOK_PATH_CACHE[key]
+
     path = Path(path).resolve()
     if path.is_file():
         if path.name == "index.json":
@@ -47,7 +67,14 @@ def resolve_book_path(path: Path) -> tuple[Path, Path]:
         index_path = folder / "index.json"
 
     if not index_path.exists():
-        # Bulletproof: create index when missing so tools don't fail
+        # Bulletproof: create index when missing so tools don't fail. The indexer is imported
+        # here so that loading config (which resolves book paths) does not pull it in.
+        from book_agent.markdown_index import (
+            TOCEnrichmentRequiredError,
+            build_index,
+            write_index,
+        )
+
         try:
             folder, md_path = resolve_folder_and_md(path)
         except ValueError:
@@ -69,4 +96,10 @@ def resolve_book_path(path: Path) -> tuple[Path, Path]:
         raise ValueError(f"No .md file found in {folder}")
 
     md_path = max(md_files, key=lambda p: p.stat().st_size)
+    mtime_ns = _folder_mtime_ns(folder)
+    if mtime_ns is not None:
+        _BOOK_PATH_CACHE[key] = (index_path, md_path, mtime_ns)
     return index_path, md_path
+
+
+resolve_book_path.cache_clear = _BOOK_PATH_CACHE.clear
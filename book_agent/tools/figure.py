@@ -4,9 +4,11 @@ Single job — all figure logic and CLI live here.
 """
 
 import base64
+import os
 import re
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 import typer
 
@@ -15,62 +17,101 @@ from book_agent.path_utils import resolve_book_path
 
 figure_app = typer.Typer(help="Resolve or show book figures (for agent image-injection test).")
 
+_FIGURE_REF_RE = re.compile(r"^!?\s*\[\s*\]\s*\(\s*(.+?)\s*\)\s*$")
+
+# Image suffix (lowercase) -> media type for the base64 payload; others are octet-stream.
+_MIME_MAP = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+}
+
 
 def _normalize_figure_ref(ref: str) -> str:
     """Extract filename from figure ref: '![](_page_22_Figure_2.jpeg)' or '_page_22_Figure_2.jpeg' -> basename."""
     ref = ref.strip()
-    m = re.match(r"^!?\s*\[\s*\]\s*\(\s*(.+?)\s*\)\s*$", ref)
+    m = _FIGURE_REF_RE.match(ref)
     if m:
         ref = m.group(1).strip()
     return Path(ref).name
 
 
+@lru_cache(maxsize=64)
+def _resolved_folder(folder: str) -> Path:
+    """Path(folder).resolve() for an absolute folder path, cached: figures are usually
+    resolved many at a time from the same book folder."""
+    return Path(folder).resolve()
+
+
+def _figure_candidate(book_folder: Path, figure_ref: str) -> Tuple[str, Path]:
+    """(filename from the ref, path it would have under the resolved book folder)."""
+    filename = _normalize_figure_ref(figure_ref)
+    return filename, _resolved_folder(os.path.abspath(book_folder)) / filename
+
+
 def resolve_figure(book_folder: Path, figure_ref: str) -> Dict[str, Any]:
     """
     Resolve a figure reference to an absolute file path under the book folder.
     Returns a small result dict: ok, path (if found), error (if not).
     """
-    book_folder = Path(book_folder).resolve()
-    filename = _normalize_figure_ref(figure_ref)
+    filename, candidate = _figure_candidate(book_folder, figure_ref)
     if not filename:
         return {"ok": False, "error": "Empty figure reference", "path": None}
-    candidate = book_folder / filename
     if not candidate.is_file():
         return {"ok": False, "error": f"Figure not found: {filename}", "path": None}
     return {"ok": True, "path": str(candidate), "error": None}
 
 
+# Bytes per read when base64-encoding an image: a multiple of 3, so every chunk but
+# the last encodes without padding and the pieces concatenate to the whole encoding.
+_B64_CHUNK = 57 * 1024
+
+
+def _read_base64(path: str) -> str:
+    """Base64 of a file, encoded chunk by chunk so the raw file is never held whole
+    alongside its (4/3 larger) encoding."""
+    encoded = bytearray()
+    with open(path, "rb") as f:
+        while chunk := f.read(_B64_CHUNK):
+            encoded += base64.standard_b64encode(chunk)
+    return encoded.decode("ascii")
+
+
 def get_figure_for_agent(
     book_folder: Path, figure_ref: str, include_image: bool = True
 ) -> Dict[str, Any]:
     """
     Get figure path + prompt (and optionally image as base64) for injecting into the calling agent.
     """
-    result = resolve_figure(book_folder, figure_ref)
-    if not result["ok"]:
-        return result
-    path = result["path"]
+    if not include_image:
+        result = resolve_figure(book_folder, figure_ref)
+        if not result["ok"]:
+            return result
+        return _figure_result(result["path"], image_base64=None, image_media_type=None)
+    # Open the file directly rather than is_file() first: one lookup instead of two
+    filename, candidate = _figure_candidate(book_folder, figure_ref)
+    if not filename:
+        return {"ok": False, "error": "Empty figure reference", "path": None}
+    path = str(candidate)
+    try:
+        image_base64 = _read_base64(path)
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return {"ok": False, "error": f"Figure not found: {filename}", "path": None}
+    except OSError as e:
+        return _figure_result(path, image_base64=None, image_media_type=None, image_error=str(e))
+    media_type = _MIME_MAP.get(candidate.suffix.lower(), "application/octet-stream")
+    return _figure_result(path, image_base64=image_base64, image_media_type=media_type)
+
+
+def _figure_result(path: str, **image: Any) -> Dict[str, Any]:
+    """Success dict for get_figure_for_agent: path, prompt, then the image fields."""
     prompt = (
         f"Figure from the book (path: {path}). "
         "Use this image to answer the user's question about the figure or the surrounding section."
     )
-    out: Dict[str, Any] = {"ok": True, "path": path, "prompt": prompt, "error": None}
-    if include_image and path:
-        try:
-            with open(path, "rb") as f:
-                out["image_base64"] = base64.standard_b64encode(f.read()).decode("ascii")
-            suffix = Path(path).suffix.lower()
-            out["image_media_type"] = (
-                "image/jpeg" if suffix in (".jpg", ".jpeg") else "image/png" if suffix == ".png" else "application/octet-stream"
-            )
-        except OSError as e:
-            out["image_base64"] = None
-            out["image_media_type"] = None
-            out["image_error"] = str(e)
-    else:
-        out["image_base64"] = None
-        out["image_media_type"] = None
-    return out
+    return {"ok": True, "path": path, "prompt": prompt, "error": None, **image}
 
 
 def _figure_path_or_current(path: Optional[Path]) -> Path:
@@ -6,7 +6,12 @@ from pathlib import Path
 from typing import Optional
 
 from book_agent.config import get_document_path_for_agent
-from book_agent.core import get_section_content, load_index, _flatten_sections
+from book_agent.core import (
+    _get_flat_sections,
+    _get_flat_titles_lower,
+    get_section_content,
+    load_index_cached,
+)
 from book_agent.path_utils import resolve_book_path
 
 
@@ -20,12 +25,16 @@ def run(path: Optional[Path] = None, query: str = "") -> str:
         if path is None:
             raise ValueError("No document path: set current workspace and current document (config set-current-workspace, add-to-workspace, set-workspace-current) or pass path.")
     index_path, md_path = resolve_book_path(path)
-    index = load_index(index_path)
-    matches = [
-        sec
-        for sec in _flatten_sections(index.get("chapters", []))
-        if query.lower().strip() in sec["title"].lower()
-    ]
-    if not matches:
+    index = load_index_cached(index_path)
+    q = query.lower().strip()
+    match = next(
+        (
+            sec
+            for sec, title in zip(_get_flat_sections(index), _get_flat_titles_lower(index))
+            if q in title
+        ),
+        None,
+    )
+    if match is None:
         raise ValueError(f"No section found matching '{query}'")
-    return get_section_content(matches[0], md_path)
+    return get_section_content(match, md_path)
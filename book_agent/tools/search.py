@@ -4,18 +4,28 @@ Results are in document order (sequential).
 """
 
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from book_agent.config import get_document_path_for_agent
-from book_agent.core import _flatten_sections, get_section_content, load_index
+from book_agent.core import (
+    _get_flat_sections,
+    _get_flat_titles_lower,
+    _get_sections_in_document_order,
+    _lowered_document,
+    load_index_cached,
+)
 from book_agent.path_utils import resolve_book_path
 
 
 def search_sections(index: Dict[str, Any], query: str) -> List[Dict]:
-    """Search for sections containing the query string in their title only (no md_path)."""
+    """Search for sections containing the query string in their title only (no md_path).
+    Matches are fresh dicts (copies of the memoized sections), so callers may modify them."""
     query = query.lower().strip()
-    all_sections = _flatten_sections(index.get("chapters", []))
-    return [sec for sec in all_sections if query in sec["title"].lower()]
+    return [
+        dict(sec)
+        for sec, title in zip(_get_flat_sections(index), _get_flat_titles_lower(index))
+        if query in title
+    ]
 
 
 def search_sections_in_content(
@@ -29,20 +39,56 @@ def search_sections_in_content(
     query_lower = query.lower().strip()
     if not query_lower:
         return []
-    all_sections = _flatten_sections(index.get("chapters", []))
-    # Sort by start line so we search in document order
-    all_sections = sorted(
-        [s for s in all_sections if s.get("md_start_line") and s.get("md_end_line")],
-        key=lambda s: (s["md_start_line"], s["md_end_line"]),
-    )
+    # Sections with line bounds, in document order (sorted once per index)
+    return _match_sections(_get_sections_in_document_order(index), query_lower, md_path)
+
+
+def search_sections_bulk(
+    index: Dict[str, Any], queries: List[str], md_path: Path
+) -> Dict[str, List[Dict]]:
+    """
+    search_sections_in_content for several queries on one book: {query: matches}.
+    The flattened, ordered sections and the lowercased document are built once and
+    shared by all the queries.
+    """
+    all_sections = _get_sections_in_document_order(index)
+    results: Dict[str, List[Dict]] = {}
+    for query in queries:
+        query_lower = query.lower().strip()
+        results[query] = _match_sections(all_sections, query_lower, md_path) if query_lower else []
+    return results
+
+
+def _match_sections(
+    sections: List[Tuple[str, Dict]], query_lower: str, md_path: Path
+) -> List[Dict]:
+    """
+    The sections whose lowercased title or content contains query_lower, in the given
+    (document) order. Section starts never decrease along that order, so the first
+    occurrence at or after the current start is found by one forward sweep and kept
+    until a later start passes it; a section matches if that occurrence ends inside
+    it. Text shared by nested sections is searched once instead of once per section.
+    Matches are returned as copies, since the sections are memoized per index.
+    """
     matches = []
-    for sec in all_sections:
-        if query_lower in (sec.get("title") or "").lower():
-            matches.append(sec)
+    text = offsets = None  # lowercased document, loaded on the first content check
+    hit = None  # first occurrence at or after the last start searched from (-1: none left)
+    for title, sec in sections:
+        if query_lower in title:
+            matches.append(dict(sec))
+            continue
+        if text is None:
+            text, offsets = _lowered_document(md_path)
+        # Same line slice as get_section_content, searched in place
+        start, end, _ = slice(
+            max(0, sec["md_start_line"] - 1), sec["md_end_line"] - 1
+        ).indices(len(offsets) - 1)
+        if start >= end:
             continue
-        content = get_section_content(sec, md_path)
-        if query_lower in content.lower():
-            matches.append(sec)
+        if hit is None or -1 < hit < offsets[start]:
+            hit = text.find(query_lower, offsets[start])
+        if hit != -1 and hit + len(query_lower) <= offsets[end]:
+            matches.append(dict(sec))
     return matches
 
 
@@ -60,5 +106,5 @@ def run(path: Optional[Path] = None, query: str = "") -> List[Dict]:
                 "(config set-current-workspace, add-to-workspace, set-workspace-current) or pass path."
             )
     index_path, md_path = resolve_book_path(path)
-    index = load_index(index_path)
+    index = load_index_cached(index_path)
     return search_sections_in_content(index, query, md_path)